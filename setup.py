@@ -53,7 +53,7 @@ setup(name="simplerobotgaze",
 
       download_url="https://projects.cit-ec.uni-bielefeld.de/git/flobi.demo.git",
 
-      scripts=["bin/simple_robot_gaze"],
+      scripts=["bin/simple_robot_gaze", "bin/simple_robot_gaze_bench", "bin/simple_robot_gaze_decode"],
 
       packages=find_packages(exclude=["*.tests",
                                       "*.tests.*",
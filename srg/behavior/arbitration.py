@@ -31,43 +31,95 @@ Authors: Florian Lier, Simon Schulz
 """
 
 # STD IMPORTS
+import os
+import re
 import sys
 import time
-import yaml
 import threading
 
 # SELF IMPORTS
 from srg.robot import driver as d
+from srg.robot import jointstate as j
+from srg.robot import sim as sm
 from srg.control import gaze as g
+from srg.control import trajectory as tj
 from srg.middleware import ros as r
+from srg.middleware import stimulus as st
+from srg.behavior import config as c
+from srg.behavior import liveness as lv
+from srg.behavior import timeouts as tm
+from srg.behavior import policy as pl
+from srg.behavior import latency as lt
+from srg.behavior import watchdog as wd
+from srg.behavior import sync as sy
+from srg.behavior import attention as an
 from srg.utils import transform as t
+from srg.utils import metrics as m
+from srg.utils import tracing as tr
+from srg.utils import lifecycle as lc
+from srg.utils import clock as ck
+from srg.utils import profiler as pr
+from srg.utils import flightrecorder as fr
 
 
-class Arbitration(threading.Thread):
+class Arbitration(lc.StoppableThread):
 
-    def __init__(self, _configfile, _outscope):
-        threading.Thread.__init__(self)
+    def __init__(self, _configfile, _outscope, _hub=None, _control=None):
+        lc.StoppableThread.__init__(self)
+        self.name             = "arbitration %s" % _outscope.strip()
         self.lock             = threading.RLock()
-        self.run_toggle       = True
         self.cfgfile          = _configfile.strip()
-        self.outscope         = _outscope
+        self.outscope         = _outscope.strip()
         self.last_info        = time.time()
         self.transforms       = []
         self.input_sources    = []
         self.gaze_controller  = []
-        self.overrides        = []
         self.is_override         = False
         self.override_type       = None
         self.boring              = None
+        self.boring_timeouts     = []
+        self.output              = None
+        self.watch_config        = False
+        self.measure_latency     = False
+        self.latency             = None
+        self.watcher             = None
+        self.watchdog            = None
+        self.shed_level          = 0
+        self.gui_rate            = None
+        self.reload_lock         = threading.Lock()
         self.config              = None
+        self.robot_config        = None
         self.winner              = None
-        self.arbitrate_toggle    = None
+        self.arbitrate_toggle    = _control
         self.rd                  = None
-        self.allow_peak_override = None
+        self.joint_history       = None
+        self.joint_feed          = None
+        self.trajectory          = None
+        self.recorder            = None
+        self.recorder_dir        = "/tmp"
+        self.ages                = [fr.NAN] * fr.MAX_SOURCES
+        self.policy              = None
+        self.synchronizer        = None
         self.loop_speed          = 1.0
+        self.last_decided        = {}
+        self.state               = (0, None)
+        # Set while a GUI reads the state, headless robots do not build it
+        self.state_wanted        = False
+        # Process start, the time to the first command is reported relative to it
+        self.startup_begin       = time.time()
+        self.first_command       = None
+        # Sources may be shared with the Arbitrations of other robots
+        self.owns_hub            = _hub is None
+        self.hub                 = st.SourceHub() if _hub is None else _hub
+        self.tick_time           = m.REGISTRY.histogram("srg_arbitration_tick_seconds", "Duration of arbitration ticks",
+                                                        {"robot": self.outscope})
+        self.stimulus_age        = m.REGISTRY.histogram("srg_stimulus_age_seconds", "Age of the winning stimulus at decision time",
+                                                        {"robot": self.outscope})
+        self.winner_switches     = m.REGISTRY.counter("srg_winner_switches_total", "Changes of the winning input source",
+                                                      {"robot": self.outscope})
 
     def boot_robot_driver(self):
-        self.rd = d.RobotDriver("ROS", self.outscope.strip())
+        self.rd = d.RobotDriver("ROS", self.outscope)
 
     def configure(self):
         self.read_yaml_config()
@@ -76,98 +128,646 @@ class Arbitration(threading.Thread):
     def read_yaml_config(self):
         try:
             print "---"
-            print ">>> Using config: %s" % self.cfgfile
+            print ">>> Using config: %s for %s" % (self.cfgfile, self.outscope)
             print "---"
-            f = open(self.cfgfile)
-            config_vals = yaml.load(f)
-            self.config = config_vals
-            f.close()
-            if len(self.config["resolution"]) != len(self.config["priorities"]) or len(self.config["resolution"]) != len(self.config["fov"]):
-                print ">>> Please check your config file, not enough values provided..."
-                sys.exit(1)
-            else:
-                pass
+            self.config = c.load(self.cfgfile)
+            self.robot_config = c.robot_config(self.config, self.outscope)
         except Exception, e:
             print ">>> %s" % str(e)
             sys.exit(1)
 
+    def boot(self):
+        """
+        Brings up the robot driver, the control channel and the input sources
+        in parallel, the sources start receiving at once. Everything that
+        sends to the robot follows once the driver is up.
+        """
+        lc.parallel([self.boot_robot_driver, self.configure_control, self.configure_sources])
+        self.configure_output()
+
     def configure_middleware(self):
+        self.configure_control()
+        self.configure_sources()
+        self.configure_output()
+
+    def configure_control(self):
         # Start the external control MW Thread
-        self.arbitrate_toggle = r.RosControlConnector()
+        if self.arbitrate_toggle is None:
+            self.arbitrate_toggle = r.RosControlConnector()
         self.arbitrate_toggle.start()
 
-        # Read config file an extract values
-        idx = 0
-        for item in self.config["priorities"]:
-            res        = self.config["resolution"][idx].split("x")
-            fov        = self.config["fov"][idx].split("x")
-            datatypes  = self.config["datatypes"][idx].split(":")
-            modes      = self.config["modes"][idx]
-            stimulus_timeout = self.config["stimulus_timeout"][idx]
-            peak_override    = int(self.config["allow_peak_override"][0])
-            self.boring      = float(self.config["boring_timeout"][0])
-
-            # Check whether peak_override is "ON" (1)
-            if peak_override is 1:
-                self.allow_peak_override = peak_override
-                allow_override_threshold = self.config["peak_overrides"][idx]
-                self.overrides.append(allow_override_threshold)
-
-            # Configure Affine Transformations
-            at = t.AffineTransform(str(item))
-            at.set_coords(float(res[0]), float(res[1]), float(fov[0]), float(fov[1]))
-            at.calculate_divider()
+    def configure_sources(self):
+        self.boring = self.robot_config["boring_timeout"]
+
+        for spec in self.robot_config["sources"]:
+            # Configure Affine Transformations, per robot
+            at = self.create_transform(spec)
             self.transforms.append(at)
 
-            # Configure Middleware Adapters
-            if datatypes[0].lower() == "ros":
-                mw = r.RosConnector(str(item), at, datatypes[1], modes, stimulus_timeout, self.lock)
-            elif datatypes[0].lower() == "rsb":
-                print ">>> RSB is currrenly not supported :| "
-                self.run_toggle = False
-                sys.exit(1)
-            else:
-                print ">>> Unknown middleware %s" % datatypes[0]
+            # Configure Middleware Adapters (shared between robots)
+            try:
+                mw = self.create_view(spec, at)
+            except ValueError, e:
+                print ">>> %s" % str(e)
                 self.run_toggle = False
                 sys.exit(1)
+            self.configure_timeouts(mw, spec, self.robot_config, self.boring)
             self.input_sources.append(mw)
+        self.boring_timeouts = [mw.boring_timeout for mw in self.input_sources]
+        # Check whether peak_override is "ON" (1)
+        self.policy = self.create_policy(self.robot_config)
+        self.synchronizer = self.create_synchronizer(self.robot_config, self.input_sources)
+        self.hub.start()
 
-            # Configure Gaze Controllers
-            gc = g.GazeController(self.rd, mw, self.lock)
-            self.gaze_controller.append(gc)
-            idx += 1
+    def configure_output(self):
+        """
+        Joint states, output stage and Gaze Controllers, needs the robot driver
+        """
+        self.configure_joint_states()
+        self.configure_latency()
+        self.output = self.configure_trajectory()
+        for mw in self.input_sources:
+            self.gaze_controller.append(self.create_controller(mw))
+
+        # Always-on record of the decisions, dumped on request
+        self.recorder = fr.FlightRecorder(self.outscope, [source.inscope for source in self.input_sources])
+        self.arbitrate_toggle.add_command("dump", self.dump_recorder)
+        self.arbitrate_toggle.add_command("timeouts", self.print_timeouts)
+        self.arbitrate_toggle.add_command("adaptive", lambda: self.set_adaptive(True))
+        self.arbitrate_toggle.add_command("static", lambda: self.set_adaptive(False))
+        self.arbitrate_toggle.add_command("reload", self.reload_config)
+        self.arbitrate_toggle.add_command("force", lambda name: self.update_policy(forced=st.normalize(name)))
+        self.arbitrate_toggle.add_command("release", lambda: self.update_policy(forced=None))
+        self.arbitrate_toggle.add_command("priorities", self.set_priorities)
+        self.arbitrate_toggle.add_command("threshold", self.set_threshold)
+        self.arbitrate_toggle.add_command("peak_override",
+                                          lambda value: self.update_policy(allow_peak_override=value in ("1", "on")))
+        self.arbitrate_toggle.add_command("enable", lambda name: self.enable_source(name, True))
+        self.arbitrate_toggle.add_command("disable", lambda name: self.enable_source(name, False))
+        self.arbitrate_toggle.add_command("policy", lambda: self.update_policy())
+        self.arbitrate_toggle.add_command("attention", self.print_attention)
+        self.arbitrate_toggle.add_command("profile", lambda state: pr.PROFILER.set_enabled(state in ("1", "on")))
+        if self.watch_config:
+            self.watcher = c.ConfigWatcher(self.cfgfile, self.reload_config)
+            self.watcher.start()
+        if self.robot_config["latency_budget"] is not None:
+            self.watchdog = wd.LatencyWatchdog(self, self.robot_config["latency_budget"])
+            self.watchdog.start()
 
         # RUN EVERYTHING!
-        for i_s in self.input_sources:
-            i_s.start()
         for g_c in self.gaze_controller:
             g_c.start()
 
+    def create_transform(self, _spec):
+        at = t.AffineTransform(_spec["inscope"])
+        at.set_coords(_spec["resolution"][0], _spec["resolution"][1], _spec["fov"][0], _spec["fov"][1])
+        at.calculate_divider()
+        return at
+
+    def create_view(self, _spec, _transform):
+        """
+        Attaches a new view to the (shared) source of _spec
+        :return the StimulusView
+        """
+        source = self.hub.source(_spec["inscope"], _spec["middleware"], _spec["datatype"],
+                                 _spec["options"], _spec["worker"])
+        self.configure_liveness(source)
+        self.configure_attention(source, _spec)
+        mw = st.StimulusView(source, _transform, _spec["mode"], _spec["stimulus_timeout"], self.lock)
+        mw.optional      = _spec["optional"]
+        mw.ready_timeout = _spec["ready_timeout"]
+        return mw
+
+    def create_controller(self, _view):
+        """
+        :return the GazeController of _view, not started yet
+        """
+        _view.joint_history = self.joint_history
+        gc = g.GazeController(self.output, _view, self.lock)
+        gc.latency = self.latency
+        return gc
+
+    def reload_config(self):
+        """
+        Applies a changed config file while running. Sources that are still
+        configured keep their subscription and gaze controller, only their
+        transform, mode and timeouts are replaced. New sources are attached,
+        removed ones detached. The rule tables are swapped at once under the
+        arbitration lock. Joint states, the trajectory stage, the latency
+        budget, failover and attention are only read at startup, a reload
+        that changes them prints a warning.
+        :return True if the new config was applied
+        """
+        self.reload_lock.acquire()
+        try:
+            then = time.time()
+            try:
+                config = c.load(self.cfgfile)
+                robot_config = c.robot_config(config, self.outscope)
+            except Exception, e:
+                print ">>> Keeping the current config, %s" % str(e)
+                return False
+            # Reject a broken config before any running source is touched
+            try:
+                for spec in robot_config["sources"]:
+                    st.SourceHub.check(spec["middleware"])
+            except ValueError, e:
+                print ">>> Keeping the current config, %s" % str(e)
+                return False
+            boring = robot_config["boring_timeout"]
+            current = dict((mw.inscope, (mw, gc)) for mw, gc in zip(self.input_sources, self.gaze_controller))
+            views, controllers, transforms, created = [], [], [], []
+            try:
+                for spec in robot_config["sources"]:
+                    at = self.create_transform(spec)
+                    mw, gc = current.get(spec["inscope"], (None, None))
+                    source = self.hub.source(spec["inscope"], spec["middleware"], spec["datatype"],
+                                             spec["options"], spec["worker"])
+                    if mw is not None and mw.source is source:
+                        del current[spec["inscope"]]
+                        mw.trans = at
+                        mw.set_mode(spec["mode"])
+                        mw.optional = spec["optional"]
+                        mw.ready_timeout = spec["ready_timeout"]
+                    else:
+                        mw = self.create_view(spec, at)
+                        gc = self.create_controller(mw)
+                        created.append((mw, gc))
+                    self.configure_timeouts(mw, spec, robot_config, boring)
+                    views.append(mw)
+                    controllers.append(gc)
+                    transforms.append(at)
+            except ValueError, e:
+                print ">>> Keeping the current config, %s" % str(e)
+                self.detach(created)
+                return False
+
+            changed = self.restart_required(config, robot_config)
+            if changed:
+                print ">>> Changes of %s need a restart, keeping the running ones" % ", ".join(changed)
+            names = [mw.inscope for mw in views]
+            policy = self.create_policy(robot_config, self.policy)
+            synchronizer = self.create_synchronizer(robot_config, views)
+            self.lock.acquire()
+            try:
+                winner = None
+                if self.winner is not None:
+                    winner = self.input_sources[self.winner].inscope
+                self.config              = config
+                self.robot_config        = robot_config
+                self.input_sources       = views
+                self.gaze_controller     = controllers
+                self.transforms          = transforms
+                self.boring              = boring
+                self.boring_timeouts     = [mw.boring_timeout for mw in views]
+                self.policy              = policy
+                self.synchronizer        = synchronizer
+                self.winner              = names.index(winner) if winner in names else None
+                if names[:fr.MAX_SOURCES] != self.recorder.sources:
+                    self.recorder = fr.FlightRecorder(self.outscope, names)
+            finally:
+                self.lock.release()
+
+            self.detach(current.values())
+            self.hub.start()
+            for mw, gc in created:
+                gc.start()
+            print ">>> Reloaded config for %s in %.1f ms, %d new and %d removed sources" % \
+                  (self.outscope, (time.time() - then) * 1000.0, len(created), len(current))
+            return True
+        finally:
+            self.reload_lock.release()
+
+    def restart_required(self, _config, _robot_config):
+        """
+        :return names of the changed settings a reload does not apply
+        """
+        changed = [name for name in ("joint_states", "trajectory", "latency_budget")
+                   if _robot_config[name] != self.robot_config[name]]
+        if _config.get("failover") != self.config.get("failover"):
+            changed.append("failover")
+        attention = dict((spec["inscope"], spec["attention"]) for spec in self.robot_config["sources"])
+        for spec in _robot_config["sources"]:
+            if spec["inscope"] in attention and spec["attention"] != attention[spec["inscope"]]:
+                changed.append("attention of %s" % spec["inscope"])
+        return changed
+
+    def create_policy(self, _robot_config, _current=None):
+        """
+        :param _current the running policy, its disabled and forced sources are kept
+        :return the Policy of _robot_config
+        """
+        names = [st.normalize(spec["inscope"]) for spec in _robot_config["sources"]]
+        thresholds = dict((st.normalize(spec["inscope"]), spec["peak_override"]) for spec in _robot_config["sources"])
+        allow_peak_override = _robot_config["allow_peak_override"] == 1
+        if _current is None:
+            return pl.Policy(names, names, thresholds, allow_peak_override)
+        return _current.rebase(names, names, thresholds, allow_peak_override)
+
+    def create_synchronizer(self, _robot_config, _views):
+        """
+        Optional stage, arbitrate on time-consistent snapshots of the sources
+        :return the ApproximateTimeSynchronizer of _robot_config or None
+        """
+        cfg = _robot_config["synchronizer"]
+        if cfg is None:
+            for view in _views:
+                view.recent = None
+            return None
+        synchronizer = sy.ApproximateTimeSynchronizer(self.outscope, float(cfg.get("slop", 0.05)),
+                                                      int(cfg.get("depth", 8)))
+        for view in _views:
+            synchronizer.attach(view)
+        return synchronizer
+
+    def update_policy(self, **_changes):
+        """
+        Swaps in a new policy, the next tick uses it. Raises ValueError for unknown sources.
+        """
+        self.reload_lock.acquire()
+        try:
+            self.policy = self.policy.replace(**_changes)
+            print ">>> Policy %s: %s" % (self.outscope, self.policy.describe())
+        finally:
+            self.reload_lock.release()
+
+    def set_priorities(self, *_names):
+        names = [name for arg in _names for name in arg.split(",") if name]
+        rest = [name for name in self.policy.priorities if name not in names]
+        self.update_policy(priorities=names + rest)
+
+    def set_threshold(self, _name, _value):
+        thresholds = dict(self.policy.thresholds)
+        thresholds[st.normalize(_name)] = float(_value)
+        self.update_policy(thresholds=thresholds)
+
+    def enable_source(self, _name, _enabled=True):
+        disabled = set(self.policy.disabled)
+        if _enabled:
+            disabled.discard(st.normalize(_name))
+        else:
+            disabled.add(st.normalize(_name))
+        self.update_policy(disabled=disabled)
+
+    def detach(self, _views):
+        """
+        Stops the gaze controllers of (view, controller) pairs and detaches the
+        views, sources without views are released
+        """
+        for mw, gc in _views:
+            gc.run_toggle = False
+            mw.source.remove_view(mw)
+            self.hub.release(mw.source)
+
+    def configure_joint_states(self):
+        """
+        Optional joint state feed, relative sources use it to compensate
+        the head motion between frame capture and command.
+        """
+        js = self.robot_config["joint_states"]
+        if js is None:
+            return
+        if isinstance(self.rd.robot_controller, sm.SimulatedHead):
+            # The simulated head publishes its joint states itself
+            self.joint_history = self.rd.robot_controller.history
+            return
+        self.joint_history = j.JointStateHistory()
+        if int(js.get("simulated", 0)) == 1:
+            self.joint_feed = j.SimulatedJointStateFeed(self.joint_history)
+            self.rd.add_listener(self.joint_feed.command)
+        else:
+            self.joint_feed = r.RosJointStateFeed(js["topic"], self.joint_history, js["pan"], js["tilt"],
+                                                  js.get("unit", "rad"))
+        self.joint_feed.start()
+
+    def configure_latency(self):
+        """
+        Optional instrumentation, stimulus to motion latency from the joint state feedback
+        """
+        if not self.measure_latency:
+            return
+        history = self.joint_history
+        if history is None and isinstance(self.rd.robot_controller, sm.SimulatedHead):
+            history = self.rd.robot_controller.history
+        if history is None:
+            print ">>> Latency measurement for %s needs joint_states or a sim:// head, disabled" % self.outscope
+            return
+        self.latency = lt.MotionLatencyTracker(self.outscope, history)
+        self.arbitrate_toggle.add_command("latency", self.latency.print_report)
+
+    def configure_liveness(self, _source):
+        """
+        Optional deadline based failover, configured for all robots at once
+        """
+        cfg = self.config.get("failover")
+        if cfg is None or _source.liveness is not None:
+            return
+        _source.liveness = lv.SourceLiveness(_source.inscope,
+                                             _source.arrivals,
+                                             float(cfg.get("k", 4.0)),
+                                             float(cfg.get("min_deadline", 0.05)),
+                                             float(cfg.get("max_deadline", 2.0)),
+                                             int(cfg.get("promote_after", 3)))
+
+    def configure_attention(self, _source, _spec):
+        """
+        Optional, time-slice the gaze among all people of a People source
+        """
+        cfg = _spec["attention"]
+        if cfg is None or _source.scheduler is not None:
+            return
+        if _source.datatype != "people" or _spec["worker"]:
+            print ">>> Attention scheduling needs a People source in process, %s attends the nearest person" % \
+                  _source.inscope
+            return
+        _source.scheduler = an.AttentionScheduler(_source.inscope,
+                                                  float(cfg.get("min_dwell", 1.0)),
+                                                  float(cfg.get("max_dwell", 3.0)),
+                                                  float(cfg.get("size_weight", 1.0)),
+                                                  float(cfg.get("wait_weight", 1.0)),
+                                                  float(cfg.get("move_weight", 1.0)),
+                                                  float(cfg.get("starve", 10.0)),
+                                                  float(cfg.get("match_radius", 50.0)),
+                                                  float(cfg.get("forget", 1.0)))
+
+    def print_attention(self):
+        for view in self.input_sources:
+            scheduler = view.source.scheduler
+            if scheduler is None:
+                continue
+            stamps = view.history.commands.snapshot()["stamps"]
+            recent = [stamp for stamp in stamps if stamp >= time.time() - 10.0]
+            print ">>> Attention %s %s: %d people in view, %d attended per minute, %.1f commands/s" % \
+                  (self.outscope, view.inscope, len(scheduler.candidates), scheduler.attended_per_minute(),
+                   len(recent) / 10.0)
+
+    def configure_timeouts(self, _view, _spec, _robot_config, _boring):
+        """
+        Effective timeouts of a view, learned from the source's rate if "adaptive_timeouts" is configured
+        """
+        cfg = _robot_config["adaptive_timeouts"]
+        bounds = cfg or {}
+        timeouts = tm.AdaptiveTimeouts(self.outscope, _view.inscope, _view.source.arrivals,
+                                       _spec["stimulus_timeout"], _boring,
+                                       float(bounds.get("k", 6.0)),
+                                       float(bounds.get("min_boring", 0.2)),
+                                       float(bounds.get("max_boring", 2.0)),
+                                       float(bounds.get("stimulus_fraction", 0.5)),
+                                       int(bounds.get("warmup", 10)))
+        timeouts.enabled = cfg is not None
+        _view.stimulus_timeout, _view.boring_timeout = timeouts.update()
+        _view.timeouts = timeouts
+
+    def adapt_timeouts(self):
+        idx = 0
+        for view in self.input_sources:
+            view.stimulus_timeout, view.boring_timeout = view.timeouts.update()
+            self.boring_timeouts[idx] = view.boring_timeout
+            idx += 1
+
+    def set_adaptive(self, _enabled):
+        for view in self.input_sources:
+            view.timeouts.enabled = _enabled
+        print ">>> %s timeouts for %s" % ("Adaptive" if _enabled else "Static", self.outscope)
+
+    def print_timeouts(self):
+        for view in self.input_sources:
+            rate = view.source.arrivals.rate()
+            print ">>> Timeouts %s %s: stimulus %.3f s, boring %.3f s, %s, rate %s" % \
+                  (self.outscope, view.inscope, view.stimulus_timeout, view.boring_timeout,
+                   "learned" if view.timeouts.learned else "static",
+                   "%.1f Hz" % rate if rate is not None else "unknown")
+
+    def check_liveness(self, _now):
+        """
+        Demotes silent sources while the arbitration is paused, so their
+        deadlines do not stay due and the failover time stays honest
+        """
+        for view in self.input_sources:
+            if view.source.liveness is not None:
+                view.source.liveness.check(_now)
+
+    def next_deadline(self, _now):
+        """
+        :return seconds until the first live source misses its deadline, None if there is none
+        """
+        result = None
+        for view in self.input_sources:
+            if view.source.liveness is not None:
+                rest = view.source.liveness.time_to_deadline(_now)
+                if rest is not None and (result is None or rest < result):
+                    result = rest
+        return result
+
+    def configure_trajectory(self):
+        """
+        Optional output stage, smooth fixed rate commands instead of steps
+        :return where the GazeControllers send their targets to
+        """
+        cfg = self.robot_config["trajectory"]
+        if cfg is None:
+            return self.rd
+        self.trajectory = tj.TrajectoryGenerator(self.rd,
+                                                 float(cfg.get("rate", 100.0)),
+                                                 cfg.get("max_velocity", [120.0, 80.0]),
+                                                 cfg.get("max_acceleration", [600.0, 400.0]),
+                                                 self.joint_history)
+        self.trajectory.start()
+        return self.trajectory
+
+    def dump_recorder(self):
+        name = re.sub("[^A-Za-z0-9]+", "_", self.outscope).strip("_")
+        path = os.path.join(self.recorder_dir, "srg_flight_%s_%d.bin" % (name, int(time.time())))
+        try:
+            return self.recorder.dump(path)
+        except Exception, e:
+            print ">>> Could not dump flight recorder %s" % str(e)
+
+    def record_tick(self, _now, _paused):
+        ages = self.ages
+        idx = 0
+        mono = ck.monotonic()
+        for source in self.input_sources[:fr.MAX_SOURCES]:
+            ages[idx] = source.age(mono) if source.current_robot_gaze_mono is not None else fr.NAN
+            idx += 1
+        winner = -1
+        target = (fr.NAN, fr.NAN)
+        if self.winner is not None:
+            winner = self.winner
+            gaze = self.input_sources[winner].current_robot_gaze
+            if gaze is not None:
+                target = (gaze.pan, gaze.tilt)
+        self.recorder.record(_now, winner, self.is_override, winner if self.is_override else -1, _paused,
+                             ages, target, self.rd.last_sent)
+
+    def add_readiness(self, _barrier, _timeout):
+        """
+        Adds the input sources, the control channel and the robot's own threads to _barrier
+        :param _timeout seconds to wait for components without their own ready_timeout
+        """
+        for mw in self.input_sources:
+            timeout = _timeout if mw.ready_timeout is None else mw.ready_timeout
+            _barrier.add("%s source %s" % (self.outscope, mw.inscope), mw, timeout, mw.optional)
+        _barrier.add("%s control" % self.outscope, self.arbitrate_toggle, _timeout)
+        for thread in (self.joint_feed, self.rd.thread):
+            if thread is not None:
+                _barrier.add("%s %s" % (self.outscope, thread.name), thread, _timeout)
+
+    def wait_for_subscribers(self, _timeout):
+        """
+        Blocks until all required components are ready
+        :param _timeout seconds to wait at most, unless a source has its own ready_timeout
+        :return True if everything required is ready
+        """
+        barrier = lc.ReadinessBarrier()
+        self.add_readiness(barrier, _timeout)
+        return not barrier.wait()
+
     def request_stop(self):
-        for connection in self.input_sources:
-            connection.run_toggle = False
+        if self.owns_hub:
+            self.hub.request_stop()
         for gazecontrol in self.gaze_controller:
             gazecontrol.run_toggle = False
         self.arbitrate_toggle.run_toggle = False
+        if self.joint_feed is not None:
+            self.joint_feed.request_stop()
+        if self.trajectory is not None:
+            self.trajectory.request_stop()
+        if self.watcher is not None:
+            self.watcher.run_toggle = False
+        if self.watchdog is not None:
+            self.watchdog.request_stop()
+        if self.rd is not None:
+            self.rd.request_stop()
         self.run_toggle = False
 
+    def components(self):
+        """
+        :return the threads owned by this robot, sources only if the hub is not shared
+        """
+        threads = list(self.gaze_controller) + [self.arbitrate_toggle]
+        for thread in (self.joint_feed, self.trajectory, self.watcher, self.watchdog, self.rd.thread):
+            if thread is not None:
+                threads.append(thread)
+        if self.owns_hub:
+            threads += self.hub.running()
+        return threads
+
+    def stop(self, _timeout=2.0):
+        """
+        Requests a stop and joins the arbitration and its components
+        :param _timeout seconds for all joins together
+        :return list of threads that did not stop in time
+        """
+        self.request_stop()
+        return lc.join_all([self] + self.components(), _timeout)
+
+    def snapshot(self):
+        """
+        Copies the time series of all input sources.
+        :return dict inscope --> series name --> {"stamps": [...], "values": [...]}
+        """
+        result = {}
+        for source in self.input_sources:
+            result[source.inscope] = source.history.snapshot()
+        return result
+
+    def source_info(self):
+        """
+        Static per source configuration for displays
+        :return list of (inscope, [fov_h, fov_v]) in priority order
+        """
+        return [(source.inscope, list(source.trans.fov)) for source in self.input_sources]
+
+    def build_state(self, _now):
+        sources = {}
+        for gc in self.gaze_controller:
+            gaze = gc.mw.current_robot_gaze
+            target = None
+            if gaze is not None:
+                target = (int(gaze.pan), int(gaze.tilt))
+            sources[gc.mw.inscope] = {"target":     target,
+                                      "loop_speed": gc.loop_speed,
+                                      "activity":   int(gc.mw.history.targets.path_length(_now - 0.5)),
+                                      "timeouts":   (round(gc.mw.stimulus_timeout, 2), round(gc.mw.boring_timeout, 2),
+                                                     gc.mw.timeouts.learned)}
+        winner = None
+        if self.winner is not None:
+            winner = self.input_sources[self.winner].inscope
+        return {"winner":        winner,
+                "is_override":   self.is_override,
+                "override_type": self.override_type,
+                "paused":        self.arbitrate_toggle.pause_auto_arbitrate,
+                "loop_speed":    self.loop_speed,
+                "shed_level":    self.shed_level,
+                "gui_rate":      self.gui_rate,
+                "sources":       sources}
+
+    def publish_state(self, _now):
+        """
+        Publishes a new state version if anything visible changed. Readers
+        (GUI) only ever see complete states, the tuple is swapped at once.
+        """
+        version, last = self.state
+        state = self.build_state(_now)
+        if state != last:
+            self.state = (version + 1, state)
+
+    def get_state(self):
+        """
+        :return (version, state dict), the version increases with every change
+        """
+        return self.state
+
+    def record_decision_latency(self, _target, _now):
+        # Only the first tick that sees a stimulus counts
+        if self.last_decided.get(_target.inscope) != _target.current_robot_gaze_timestamp:
+            self.last_decided[_target.inscope] = _target.current_robot_gaze_timestamp
+            _target.history.add_decision(_now, _now - _target.current_robot_gaze_arrival)
+
     def get_latest_targets(self):
         updates = []
+        ages = []
         stimulus_timeouts = []
         current_gaze_values = []
-        for target in self.input_sources:
-            if target.current_robot_gaze is not None:
-                updates.append(target.current_robot_gaze_timestamp)
+        now = time.time()
+        mono = ck.monotonic()
+        self.adapt_timeouts()
+        # One read per tick, control commands swap the whole policy
+        policy = self.policy
+        if policy.forced_idx is not None:
+            self.is_override = False
+            self.override_type = None
+            self.set_winner(policy.forced_idx, self.input_sources[policy.forced_idx].current_robot_gaze_timestamp)
+            return
+        snapshot = None
+        if self.synchronizer is not None:
+            snapshot = self.synchronizer.snapshot(self.input_sources, mono)
+        for idx in policy.order:
+            target = self.input_sources[idx]
+            # Demoted (silent) sources are treated like sources without data
+            liveness = target.source.liveness
+            live = liveness is None or liveness.check(mono)
+            # With a synchronizer, the source's stimulus in the snapshot counts
+            stimulus = target if snapshot is None else snapshot[idx]
+            if target.current_robot_gaze is not None and stimulus is not None and live:
+                self.record_decision_latency(target, now)
+                updates.append(stimulus.current_robot_gaze_timestamp)
+                ages.append(stimulus.age(mono))
                 stimulus_timeouts.append(target.stimulus_timeout)
-                current_gaze_values.append(target)
+                current_gaze_values.append(stimulus)
             else:
                 updates.append(None)
+                ages.append(None)
                 stimulus_timeouts.append(target.stimulus_timeout)
                 current_gaze_values.append(None)
-        self.derive_order_and_set_winner(updates, stimulus_timeouts, current_gaze_values)
+        self.derive_order_and_set_winner(updates, stimulus_timeouts, current_gaze_values, policy, ages)
 
-    def derive_order_and_set_winner(self, _updates, _stimulus_timeouts, _current_gaze_values):
-        now = time.time()
+    def derive_order_and_set_winner(self, _updates, _stimulus_timeouts, _current_gaze_values, _policy, _ages):
+        """
+        The lists hold the enabled sources in the priority order of _policy.
+        Staleness is judged by _ages (monotonic, skew corrected), not by the stamps.
+        """
         self.is_override = False
         self.override_type = None
         winner = 0
@@ -178,32 +778,32 @@ class Arbitration(threading.Thread):
             print ">>> Waiting for data..."
             return
         # Now honor priority and latest input
-        if self.allow_peak_override is not None:
-            if len(_current_gaze_values) != len(self.overrides) or len(_current_gaze_values) != len(_stimulus_timeouts):
+        if _policy.allow_peak_override:
+            if len(_current_gaze_values) != len(_policy.overrides) or len(_current_gaze_values) != len(_stimulus_timeouts):
                 print ">>> Waiting for data in override mode..."
                 return
             for stamp_override in _updates:
                 p += 1
-                if stamp_override is not None:
+                if stamp_override is not None and _policy.overrides[p] is not None:
                     if _current_gaze_values[p].datatype.lower() == "people":
-                        if int(_current_gaze_values[p].nearest_person_z) >= int(self.overrides[p]) and now - stamp_override <= _stimulus_timeouts[p] + self.boring:
+                        if int(_current_gaze_values[p].nearest_person_z) >= int(_policy.overrides[p]) and _ages[p] <= _stimulus_timeouts[p] + self.boring_timeouts[_policy.order[p]]:
                             print ">>> Override %s" % _current_gaze_values[p].datatype.lower()
                             winner = p
                             self.is_override = True
-                            self.override_type = self.input_sources[p].inscope
+                            self.override_type = _current_gaze_values[p].inscope
                             break
                     if _current_gaze_values[p].datatype.lower() == "pointstamped":
-                        if int(_current_gaze_values[p].point_z) <= int(self.overrides[p]) and now - stamp_override <= _stimulus_timeouts[p] + self.boring:
+                        if int(_current_gaze_values[p].point_z) <= int(_policy.overrides[p]) and _ages[p] <= _stimulus_timeouts[p] + self.boring_timeouts[_policy.order[p]]:
                             print ">>> Override %s" % _current_gaze_values[p].datatype.lower()
                             winner = p
                             self.is_override = True
-                            self.override_type = self.input_sources[p].inscope
+                            self.override_type = _current_gaze_values[p].inscope
                             break
         if self.is_override is False:
             for stamp in _updates:
                 n += 1
                 if stamp is not None:
-                    if now - stamp <= _stimulus_timeouts[n] + self.boring:
+                    if _ages[n] <= _stimulus_timeouts[n] + self.boring_timeouts[_policy.order[n]]:
                         idx += 1
                         winner = idx
                         break
@@ -215,21 +815,52 @@ class Arbitration(threading.Thread):
                     idx += 1
 
         # Now enable the correct gaze controller, if we dont have anything, always
-        # prioritize first input (0)
+        # prioritize the first enabled input
+        if _policy.order:
+            self.set_winner(_policy.order[winner], _updates[winner])
+        else:
+            self.set_winner(None, None)
+
+    def set_winner(self, _winner, _stamp):
+        """
+        :param _winner index of the winning source, None disables all gaze controllers
+        :param _stamp stamp of the winning stimulus or None
+        """
         idx = 0
         for gz in self.gaze_controller:
-            if idx == winner:
+            if idx == _winner:
                 gz.acquire_prio = True
                 now = time.time()
-                self.winner = winner
+                if self.winner is not None and self.winner != _winner:
+                    self.winner_switches.inc()
+                self.winner = _winner
+                if _stamp is not None:
+                    self.stimulus_age.observe(self.input_sources[_winner].age(ck.monotonic()))
                 if now - self.last_info >= 1.0:
-                    print ">>> Winning input is %s" % self.input_sources[winner].inscope
+                    print ">>> Winning input is %s" % self.input_sources[_winner].inscope
                     self.last_info = time.time()
             else:
                 gz.acquire_prio = False
             idx += 1
+        if _winner is None:
+            self.winner = None
+
+    def report_first_command(self):
+        self.first_command = self.rd.first_sent - self.startup_begin
+        m.REGISTRY.gauge("srg_first_command_seconds", "Time from startup to the first command sent",
+                         {"robot": self.outscope}).set(self.first_command)
+        print ">>> Time to first command for %s: %.1f ms" % (self.outscope, self.first_command * 1000.0)
 
     def run(self):
+        try:
+            self.arbitrate()
+        except Exception:
+            # Keep the evidence of what happened before the crash
+            if self.recorder is not None:
+                self.dump_recorder()
+            raise
+
+    def arbitrate(self):
         loop_count = 0
         init_time = time.time()
         while self.run_toggle:
@@ -238,18 +869,43 @@ class Arbitration(threading.Thread):
             then = time.time()
             if self.arbitrate_toggle.pause_auto_arbitrate is False:
                 self.lock.acquire()
+                locked = time.time()
                 self.get_latest_targets()
+                stamp = None
+                if self.winner is not None:
+                    stamp = self.input_sources[self.winner].current_robot_gaze_timestamp
                 self.lock.release()
+                done = time.time()
+                self.tick_time.observe(done - then)
+                if tr.TRACER.enabled:
+                    tr.TRACER.span("lock_wait", then, locked, stamp)
+                    tr.TRACER.span("arbitration_tick", locked, done, stamp)
             else:
                 for gz in self.gaze_controller:
                     gz.acquire_prio = False
+                self.check_liveness(ck.monotonic())
             now = time.time()
             if tick - init_time >= 1.0:
                 self.loop_speed = loop_count
                 loop_count = 0
                 init_time = time.time()
-            # Running with maximum frequency of 50 Hz
+            # A config reload swaps the sources, winner and sources must match
+            self.lock.acquire()
+            self.record_tick(now, self.arbitrate_toggle.pause_auto_arbitrate)
+            if self.state_wanted:
+                self.publish_state(now)
+            self.lock.release()
+            if self.latency is not None:
+                self.latency.poll(now)
+            if self.first_command is None and self.rd.first_sent is not None:
+                self.report_first_command()
+            # Running with maximum frequency of 50 Hz, earlier if a source is about to miss its deadline
             hz = 0.02-(now-then)
+            deadline = self.next_deadline(ck.monotonic())
+            if deadline is not None and deadline < hz:
+                hz = max(deadline, 0.001)
             if hz > 0:
-                time.sleep(hz)
+                self.wait(hz)
+        if self.latency is not None:
+            self.latency.print_report()
         print ">>> Stopping Arbitration"
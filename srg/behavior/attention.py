@@ -0,0 +1,209 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import math
+import threading
+from collections import deque
+
+# SELF IMPORTS
+from srg.utils import metrics as m
+from srg.utils import clock as ck
+
+
+class Candidate:
+    """
+    One person seen in the People stream
+    """
+    def __init__(self, _ident, _position, _now):
+        self.ident     = _ident
+        self.position  = _position
+        self.last_seen = _now
+        self.attended  = None
+
+
+class AttentionScheduler:
+    """
+    Time-slices the gaze of a People source among everyone in view instead
+    of fixating the nearest person. Candidates are tracked by name, or by
+    the nearest position within "match_radius" pixels if the detector does
+    not name them, and forgotten after "forget" seconds out of view. The
+    attended person is kept for a dwell time between "min_dwell" and
+    "max_dwell" seconds, longer for nearer (larger) people. A timer then
+    shifts the gaze to the candidate with the best score: nearer people
+    (size_weight) and people not attended for a while (wait_weight, up to
+    "starve" seconds) are preferred, long moves are penalized (move_weight).
+    """
+    def __init__(self, _inscope, _min_dwell=1.0, _max_dwell=3.0, _size_weight=1.0, _wait_weight=1.0,
+                 _move_weight=1.0, _starve=10.0, _match_radius=50.0, _forget=1.0):
+        self.inscope      = _inscope
+        self.min_dwell    = float(_min_dwell)
+        self.max_dwell    = float(_max_dwell)
+        self.size_weight  = float(_size_weight)
+        self.wait_weight  = float(_wait_weight)
+        self.move_weight  = float(_move_weight)
+        self.starve       = float(_starve)
+        self.match_radius = float(_match_radius)
+        self.forget       = float(_forget)
+        self.lock         = threading.Lock()
+        self.candidates   = {}
+        self.current      = None
+        self.timer        = None
+        self.stopped      = False
+        self.next_ident   = 0
+        # (time, ident) of the gaze shifts of the last minute
+        self.shifts       = deque()
+        labels = {"source": _inscope}
+        self.shift_count  = m.REGISTRY.counter("srg_attention_shifts_total", "Gaze shifts between people", labels)
+        self.attended_gauge = m.REGISTRY.gauge("srg_attended_per_minute", "People attended in the last minute",
+                                               labels)
+        self.candidate_gauge = m.REGISTRY.gauge("srg_attention_candidates", "People tracked by the scheduler",
+                                                labels)
+
+    def select(self, _people):
+        """
+        Called for every People message
+        :param _people list of (x, y, z) or (x, y, z, name) in pixels
+        :return the position of the attended person or None
+        """
+        now = ck.monotonic()
+        self.lock.acquire()
+        try:
+            self.associate(_people, now)
+            for ident in [c.ident for c in self.candidates.values() if now - c.last_seen > self.forget]:
+                del self.candidates[ident]
+            self.candidate_gauge.set(len(self.candidates))
+            if self.current not in self.candidates:
+                self.shift(now)
+            current = self.candidates.get(self.current)
+            return current.position if current is not None else None
+        finally:
+            self.lock.release()
+
+    def associate(self, _people, _now):
+        unmatched = dict(self.candidates)
+        for person in _people:
+            position = tuple(person[:3])
+            name = person[3] if len(person) > 3 and person[3] else None
+            match = None
+            if name is not None:
+                match = unmatched.get(name)
+            else:
+                best = self.match_radius
+                for candidate in unmatched.values():
+                    distance = self.distance(candidate.position, position)
+                    if distance <= best:
+                        best = distance
+                        match = candidate
+            if match is None:
+                if name is None:
+                    name = self.next_ident
+                    self.next_ident += 1
+                match = Candidate(name, position, _now)
+                self.candidates[name] = match
+            else:
+                del unmatched[match.ident]
+            match.position = position
+            match.last_seen = _now
+
+    @staticmethod
+    def distance(_a, _b):
+        return math.hypot(_a[0] - _b[0], _a[1] - _b[1])
+
+    def dwell(self, _candidate):
+        largest = max(c.position[2] for c in self.candidates.values())
+        share = float(_candidate.position[2]) / largest if largest > 0 else 1.0
+        return self.min_dwell + (self.max_dwell - self.min_dwell) * share
+
+    def score(self, _candidate, _previous, _now, _largest, _farthest):
+        size = float(_candidate.position[2]) / _largest if _largest > 0 else 0.0
+        if _candidate.attended is None:
+            wait = 1.0
+        else:
+            wait = min(1.0, (_now - _candidate.attended) / self.starve)
+        move = 0.0
+        if _previous is not None and _farthest > 0:
+            move = self.distance(_previous.position, _candidate.position) / _farthest
+        return self.size_weight * size + self.wait_weight * wait - self.move_weight * move
+
+    def shift(self, _now):
+        """
+        Attends the best candidate other than the current one, call with the lock held
+        """
+        previous = self.candidates.get(self.current)
+        choices = [c for c in self.candidates.values() if c is not previous] or self.candidates.values()
+        if not choices:
+            self.current = None
+            return
+        largest = max(c.position[2] for c in choices)
+        farthest = 0.0
+        if previous is not None:
+            farthest = max(self.distance(previous.position, c.position) for c in choices)
+        best = max(choices, key=lambda c: self.score(c, previous, _now, largest, farthest))
+        if best is not previous:
+            self.shift_count.inc()
+        self.current = best.ident
+        best.attended = _now
+        self.shifts.append((_now, best.ident))
+        while self.shifts and _now - self.shifts[0][0] > 60.0:
+            self.shifts.popleft()
+        self.attended_gauge.set(self.attended_per_minute())
+        self.schedule(self.dwell(best))
+
+    def schedule(self, _delay):
+        if self.timer is not None:
+            self.timer.cancel()
+        if self.stopped:
+            return
+        self.timer = threading.Timer(_delay, self.expire)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def expire(self):
+        self.lock.acquire()
+        try:
+            self.timer = None
+            if self.candidates and not self.stopped:
+                self.shift(ck.monotonic())
+        finally:
+            self.lock.release()
+
+    def attended_per_minute(self):
+        return len(set(ident for stamp, ident in self.shifts))
+
+    def stop(self):
+        self.lock.acquire()
+        self.stopped = True
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        self.lock.release()
@@ -0,0 +1,159 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import yaml
+
+# SELF IMPORTS
+from srg.utils import lifecycle as lc
+
+
+def load(_path):
+    """
+    Reads and checks a Simple Robot Gaze config file
+    :param _path location of the yaml file
+    :return the config dict
+    """
+    f = open(_path)
+    try:
+        config = yaml.load(f)
+    finally:
+        f.close()
+    if len(config["resolution"]) != len(config["priorities"]) or len(config["resolution"]) != len(config["fov"]):
+        raise ValueError("Please check your config file, not enough values provided...")
+    return config
+
+
+def robot_config(_config, _outscope):
+    """
+    Derives the configuration of one robot. The top level lists describe
+    the input sources. An optional "robots" section may override, per
+    outscope, the order of "priorities" (also a subset of the sources) and
+    the lists "fov", "modes", "stimulus_timeout", "peak_overrides",
+    "boring_timeout" and "allow_peak_override" as well as the "joint_states"
+    feed, the "trajectory" output stage, the "adaptive_timeouts" bounds, the
+    "latency_budget" and the "synchronizer". Overriding lists follow the robot's priorities.
+    Datatype, resolution, "workers", "source_options", "optional_sources",
+    "ready_timeouts" and "attention" belong to the source and are shared by
+    all robots.
+    :param _config dict as returned by load
+    :param _outscope the robot's outscope
+    :return dict with "sources" (list of per source dicts in priority order),
+            "joint_states", "trajectory", "adaptive_timeouts", "latency_budget",
+            "synchronizer", "boring_timeout" and "allow_peak_override"
+    """
+    robots = _config.get("robots") or {}
+    section = robots.get(_outscope) or {}
+    priorities = [str(item) for item in _config["priorities"]]
+    specs = {}
+    idx = 0
+    for inscope in priorities:
+        datatype = _config["datatypes"][idx].split(":")
+        spec = {"inscope":          inscope,
+                "middleware":       datatype[0].lower(),
+                "datatype":         datatype[1],
+                "resolution":       [float(v) for v in _config["resolution"][idx].split("x")],
+                "fov":              [float(v) for v in _config["fov"][idx].split("x")],
+                "mode":             _config["modes"][idx],
+                "stimulus_timeout": float(_config["stimulus_timeout"][idx]),
+                "peak_override":    None,
+                "options":          None,
+                "worker":           False,
+                "optional":         False,
+                "ready_timeout":    None,
+                "attention":        None}
+        if "source_options" in _config and idx < len(_config["source_options"]):
+            spec["options"] = _config["source_options"][idx]
+        if "workers" in _config and idx < len(_config["workers"]):
+            spec["worker"] = int(_config["workers"][idx]) == 1
+        if "peak_overrides" in _config and idx < len(_config["peak_overrides"]):
+            spec["peak_override"] = _config["peak_overrides"][idx]
+        if "optional_sources" in _config and idx < len(_config["optional_sources"]):
+            spec["optional"] = int(_config["optional_sources"][idx]) == 1
+        if "ready_timeouts" in _config and idx < len(_config["ready_timeouts"]):
+            spec["ready_timeout"] = float(_config["ready_timeouts"][idx])
+        if "attention" in _config and idx < len(_config["attention"]):
+            spec["attention"] = _config["attention"][idx] or None
+        specs[inscope] = spec
+        idx += 1
+
+    order = [str(item) for item in section.get("priorities", priorities)]
+    idx = 0
+    for inscope in order:
+        if inscope not in specs:
+            raise ValueError("Robot %s uses unknown source %s" % (_outscope, inscope))
+        if "fov" in section:
+            specs[inscope]["fov"] = [float(v) for v in section["fov"][idx].split("x")]
+        if "modes" in section:
+            specs[inscope]["mode"] = section["modes"][idx]
+        if "stimulus_timeout" in section:
+            specs[inscope]["stimulus_timeout"] = float(section["stimulus_timeout"][idx])
+        if "peak_overrides" in section:
+            specs[inscope]["peak_override"] = section["peak_overrides"][idx]
+        idx += 1
+
+    return {"sources":             [specs[inscope] for inscope in order],
+            "joint_states":        section.get("joint_states", _config.get("joint_states")),
+            "trajectory":          section.get("trajectory", _config.get("trajectory")),
+            "adaptive_timeouts":   section.get("adaptive_timeouts", _config.get("adaptive_timeouts")),
+            "latency_budget":      section.get("latency_budget", _config.get("latency_budget")),
+            "synchronizer":        section.get("synchronizer", _config.get("synchronizer")),
+            "boring_timeout":      float(section.get("boring_timeout", _config["boring_timeout"])[0]),
+            "allow_peak_override": int(section.get("allow_peak_override", _config["allow_peak_override"])[0])}
+
+
+class ConfigWatcher(lc.StoppableThread):
+    """
+    Polls the modification time of a config file and calls back on changes
+    """
+    def __init__(self, _path, _callback, _interval=1.0):
+        lc.StoppableThread.__init__(self)
+        self.name       = "config watcher"
+        self.path       = _path
+        self.callback   = _callback
+        self.interval   = _interval
+        self.mtime      = self.modified()
+
+    def modified(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def run(self):
+        print ">>> Watching config file %s" % self.path
+        while not self.wait(self.interval):
+            mtime = self.modified()
+            if mtime is not None and mtime != self.mtime:
+                self.mtime = mtime
+                self.callback()
@@ -0,0 +1,184 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import math
+import threading
+import collections
+
+# HLRC IMPORTS
+from hlrc_client import RobotGaze
+
+# SELF IMPORTS
+from srg.utils import ringbuffer as rb
+from srg.utils import metrics as m
+
+
+# perception: capture --> received, srg: received --> command sent,
+# motion: command sent --> head moves towards the target, total: capture --> motion.
+# The capture time is the arrival minus the source's skew corrected transport
+# delay (see ClockOffsetEstimator), not the raw header stamp.
+STAGES = ("perception", "srg", "motion", "total")
+
+
+class MotionLatencyTracker:
+    """
+    Matches the head motion seen in the joint state feedback to the
+    commands that caused it and to their stimulus stamps. A command counts
+    as executed when the head moved "onset" degrees from its pose at
+    command time towards the commanded target. Only commands that change
+    the target by at least "min_step" degrees are matched, repeated or
+    small ones hardly change the motion. Joint
+    state stamps are compared with local time, the robot's clock has to be
+    synchronized for the motion stage to be meaningful.
+    """
+    def __init__(self, _robot, _history, _min_step=2.0, _onset=0.5, _timeout=2.0):
+        self.robot     = _robot
+        self.history   = _history
+        self.min_step  = float(_min_step)
+        self.onset     = float(_onset)
+        self.timeout   = float(_timeout)
+        self.lock      = threading.Lock()
+        self.pending   = collections.deque()
+        self.series    = {}
+        self.last_seen = None
+        self.last_target = None
+        # Switched off by the LatencyWatchdog under load
+        self.enabled   = True
+        self.unmatched = m.REGISTRY.counter("srg_motion_unmatched_total", "Commands without matching head motion",
+                                            {"robot": _robot})
+
+    def stage(self, _inscope, _stage):
+        key = (_inscope, _stage)
+        if key not in self.series:
+            labels = {"robot": self.robot, "source": _inscope, "stage": _stage}
+            self.series[key] = (rb.RingBuffer(), m.REGISTRY.histogram("srg_e2e_latency_seconds",
+                                                                       "Stimulus to motion latency per stage", labels))
+        return self.series[key]
+
+    def observe(self, _inscope, _stage, _now, _value):
+        series, histogram = self.stage(_inscope, _stage)
+        series.push(_now, _value)
+        histogram.observe(_value)
+
+    def command(self, _view, _gaze, _sent):
+        """
+        Called by the GazeController after sending _gaze, with the view's lock held
+        """
+        if not self.enabled:
+            return
+        arrival = _view.current_robot_gaze_arrival
+        delay = _view.current_robot_gaze_delay
+        captured = arrival - delay
+        self.lock.acquire()
+        try:
+            self.observe(_view.inscope, "perception", _sent, delay)
+            self.observe(_view.inscope, "srg", _sent, _sent - arrival)
+            pose = self.history.latest()
+            if pose is None:
+                return
+            if _gaze.gaze_type == RobotGaze.GAZETARGET_RELATIVE:
+                target = (pose[0] + _gaze.pan, pose[1] + _gaze.tilt)
+            else:
+                target = (_gaze.pan, _gaze.tilt)
+            # Repeated commands to a target the head already moves to would match at once
+            last, self.last_target = self.last_target, target
+            if last is not None and math.hypot(target[0] - last[0], target[1] - last[1]) < self.min_step:
+                return
+            dx, dy = target[0] - pose[0], target[1] - pose[1]
+            distance = math.hypot(dx, dy)
+            if distance >= self.min_step:
+                self.pending.append((_sent, _view.inscope, captured, pose, dx / distance, dy / distance))
+        finally:
+            self.lock.release()
+
+    def poll(self, _now):
+        """
+        Matches new joint state samples to pending commands, called periodically
+        """
+        if not self.enabled:
+            self.pending.clear()
+            return
+        count = self.history.buffer.count
+        first = count
+        while first > 0 and (self.last_seen is None or self.history.sample(first - 1)[0] > self.last_seen):
+            first -= 1
+        self.lock.acquire()
+        try:
+            for n in xrange(first, count):
+                stamp, pan, tilt = self.history.sample(n)
+                self.last_seen = stamp
+                self.match(stamp, pan, tilt)
+            while self.pending and _now - self.pending[0][0] > self.timeout:
+                self.pending.popleft()
+                self.unmatched.inc()
+        finally:
+            self.lock.release()
+
+    def match(self, _stamp, _pan, _tilt):
+        keep = collections.deque()
+        for command in self.pending:
+            sent, inscope, stimulus, pose, ux, uy = command
+            if _stamp > sent and (_pan - pose[0]) * ux + (_tilt - pose[1]) * uy >= self.onset:
+                self.observe(inscope, "motion", _stamp, _stamp - sent)
+                self.observe(inscope, "total", _stamp, _stamp - stimulus)
+            else:
+                keep.append(command)
+        self.pending = keep
+
+    def report(self):
+        """
+        :return dict inscope --> stage --> (samples, p50, p95, p99) in seconds, of the recent samples
+        """
+        result = {}
+        self.lock.acquire()
+        try:
+            for (inscope, stage), (series, histogram) in self.series.items():
+                values = sorted(series.snapshot()["values"])
+                if not values:
+                    continue
+                n = len(values)
+                result.setdefault(inscope, {})[stage] = (n, values[n / 2], values[min(n - 1, int(n * 0.95))],
+                                                         values[min(n - 1, int(n * 0.99))])
+        finally:
+            self.lock.release()
+        return result
+
+    def print_report(self):
+        print ">>> Latency of %s in ms" % self.robot
+        print ">>> %-24s %-10s %6s %8s %8s %8s" % ("source", "stage", "n", "p50", "p95", "p99")
+        for inscope, stages in sorted(self.report().items()):
+            for stage in STAGES:
+                if stage in stages:
+                    n, p50, p95, p99 = stages[stage]
+                    print ">>> %-24s %-10s %6d %8.1f %8.1f %8.1f" % (inscope, stage, n, p50 * 1000.0,
+                                                                    p95 * 1000.0, p99 * 1000.0)
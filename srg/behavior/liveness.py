@@ -0,0 +1,98 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# SELF IMPORTS
+from srg.utils import metrics as m
+
+
+class SourceLiveness:
+    """
+    Detects silent sources. The deadline for the next message adapts to the
+    inter-arrival times the source estimates itself ("arrivals"), the source
+    updates that estimate after "arrival" was called. A source that misses
+    its deadline is demoted at once and only promoted again after
+    "promote_after" consecutive messages that arrived within their deadline.
+    """
+    def __init__(self, _inscope, _arrivals, _k=4.0, _min_deadline=0.05, _max_deadline=2.0, _promote_after=3):
+        self.inscope       = _inscope
+        self.k             = float(_k)
+        self.min_deadline  = float(_min_deadline)
+        self.max_deadline  = float(_max_deadline)
+        self.promote_after = int(_promote_after)
+        self.estimator     = _arrivals
+        self.live          = False
+        self.streak        = 0
+        self.last_arrival  = None
+        self.failover      = m.REGISTRY.histogram("srg_failover_seconds", "Silence of a source until it was demoted",
+                                                  {"source": _inscope})
+        self.demotions     = m.REGISTRY.counter("srg_demotions_total", "Sources demoted for missing their deadline",
+                                                {"source": _inscope})
+
+    def deadline(self):
+        return self.estimator.deadline(self.k, self.min_deadline, self.max_deadline)
+
+    def arrival(self, _arrival):
+        on_time = self.last_arrival is not None and _arrival - self.last_arrival <= self.deadline()
+        self.last_arrival = _arrival
+        if self.live:
+            return
+        self.streak = self.streak + 1 if on_time or self.streak == 0 else 1
+        if self.streak >= self.promote_after:
+            self.live = True
+            self.streak = 0
+            print ">>> Source %s is live again" % self.inscope
+
+    def check(self, _now):
+        """
+        Demotes the source if it missed its deadline
+        :return True if the source is live
+        """
+        last = self.last_arrival
+        if self.live and last is not None and _now - last > self.deadline():
+            self.live = False
+            self.streak = 0
+            self.demotions.inc()
+            self.failover.observe(_now - last)
+            print ">>> Source %s silent for %.0f ms (deadline %.0f ms), demoted" % \
+                  (self.inscope, (_now - last) * 1000.0, self.deadline() * 1000.0)
+        return self.live
+
+    def time_to_deadline(self, _now):
+        """
+        :return seconds until a live source misses its deadline, None if not live or already missed
+        """
+        if not self.live or self.last_arrival is None:
+            return None
+        rest = self.last_arrival + self.deadline() - _now
+        if rest < 0.0:
+            return None
+        return rest
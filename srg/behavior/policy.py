@@ -0,0 +1,98 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+
+class Policy:
+    """
+    The arbitration rules of one robot: priority order, enabled sources,
+    peak override thresholds and an optional forced source. A policy is
+    never modified, changes create a new one that replaces the old one
+    with a single assignment, so the arbitration tick reads it without
+    locking. Sources are given by inscope, the tick uses the compiled
+    indices into the Arbitration's source list.
+    """
+    def __init__(self, _sources, _priorities, _thresholds, _allow_peak_override, _disabled=(), _forced=None):
+        """
+        :param _sources inscopes in the order of the Arbitration's source list
+        :param _priorities inscopes, highest priority first
+        :param _thresholds dict inscope --> peak override threshold
+        """
+        self.sources             = tuple(_sources)
+        self.priorities          = tuple(self.check(_priorities))
+        self.thresholds          = dict(_thresholds)
+        self.allow_peak_override = bool(_allow_peak_override)
+        self.disabled            = frozenset(self.check(_disabled))
+        self.forced              = _forced
+        if set(self.priorities) != set(self.sources) or len(self.priorities) != len(self.sources):
+            raise ValueError("Priorities must name every source once: %s" % ", ".join(self.sources))
+        if _forced is not None:
+            self.check([_forced])
+        # Compiled for the tick: source indices of the enabled sources in priority order
+        self.order      = tuple(self.sources.index(name) for name in self.priorities if name not in self.disabled)
+        self.overrides  = [self.thresholds.get(self.sources[idx]) for idx in self.order]
+        self.forced_idx = self.sources.index(_forced) if _forced is not None else None
+
+    def check(self, _names):
+        names = [str(name).lower().strip() for name in _names]
+        for name in names:
+            if name not in self.sources:
+                raise ValueError("Unknown source %s" % name)
+        return names
+
+    def replace(self, **_changes):
+        """
+        :param _changes any of priorities, thresholds, allow_peak_override, disabled, forced
+        :return a new Policy with _changes applied
+        """
+        values = {"priorities":          self.priorities,
+                  "thresholds":          self.thresholds,
+                  "allow_peak_override": self.allow_peak_override,
+                  "disabled":            self.disabled,
+                  "forced":              self.forced}
+        values.update(_changes)
+        return Policy(self.sources, values["priorities"], values["thresholds"], values["allow_peak_override"],
+                      values["disabled"], values["forced"])
+
+    def rebase(self, _sources, _priorities, _thresholds, _allow_peak_override):
+        """
+        Policy for a reloaded source list, keeps the runtime changes
+        (disabled and forced sources) that still apply
+        """
+        disabled = [name for name in self.disabled if name in _sources]
+        forced = self.forced if self.forced in _sources else None
+        return Policy(_sources, _priorities, _thresholds, _allow_peak_override, disabled, forced)
+
+    def describe(self):
+        return "priorities %s, disabled [%s], forced %s, peak override %s, thresholds %s" % \
+               (", ".join(self.priorities), ", ".join(sorted(self.disabled)), self.forced,
+                "on" if self.allow_peak_override else "off",
+                ", ".join("%s=%s" % (name, self.thresholds.get(name)) for name in self.priorities))
@@ -0,0 +1,115 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+from collections import deque
+
+# SELF IMPORTS
+from srg.utils import metrics as m
+
+
+class SyncedStimulus:
+    """
+    One buffered stimulus of a view, offers what the arbitration reads
+    from a StimulusView: stamp, age and the size (z) for overrides.
+    """
+    def __init__(self, _view, _entry):
+        self.inscope  = _view.inscope
+        self.datatype = _view.datatype
+        self.time, self.current_robot_gaze_timestamp, self.mono, self.delay, z = _entry
+        self.nearest_person_z = z
+        self.point_z          = z
+
+    def age(self, _now):
+        return _now - self.mono + self.delay
+
+
+class ApproximateTimeSynchronizer:
+    """
+    Aligns the recent stimuli of several views by their capture time, the
+    header stamp corrected by the source's clock offset. Every view keeps
+    its last "depth" stimuli. A snapshot is taken at the pivot, the oldest
+    of the newest stimuli of all sources that are not boring anyway. Every
+    source contributes its stimulus closest to the pivot, sources without
+    one within "slop" seconds are left out of the snapshot. Costs O(1) per
+    message and O(sources * depth) per tick.
+    """
+    def __init__(self, _robot, _slop=0.05, _depth=8):
+        self.slop   = float(_slop)
+        self.depth  = int(_depth)
+        self.spread = m.REGISTRY.histogram("srg_sync_spread_seconds", "Capture time spread of synchronized snapshots",
+                                           {"robot": _robot})
+        self.excluded = m.REGISTRY.counter("srg_sync_excluded_total", "Sources left out of a snapshot, beyond the slop",
+                                           {"robot": _robot})
+
+    def attach(self, _view):
+        """
+        Lets _view buffer its stimuli, keeps what is buffered already
+        """
+        recent = _view.recent
+        _view.recent = deque(recent or (), self.depth)
+
+    def snapshot(self, _views, _now):
+        """
+        Call with the views' lock held
+        :param _now monotonic clock
+        :return list with a SyncedStimulus or None per view
+        """
+        pivot = None
+        active = []
+        for view in _views:
+            fresh = bool(view.recent) and view.age(_now) <= view.stimulus_timeout + view.boring_timeout
+            active.append(fresh)
+            if fresh and (pivot is None or view.recent[-1][0] < pivot):
+                pivot = view.recent[-1][0]
+        if pivot is None:
+            return [None] * len(_views)
+        result = []
+        first = last = pivot
+        for idx, view in enumerate(_views):
+            best = None
+            if view.recent:
+                for entry in view.recent:
+                    if best is None or abs(entry[0] - pivot) < abs(best[0] - pivot):
+                        best = entry
+                if abs(best[0] - pivot) > self.slop:
+                    if active[idx]:
+                        self.excluded.inc()
+                    best = None
+            if best is None:
+                result.append(None)
+            else:
+                first = min(first, best[0])
+                last = max(last, best[0])
+                result.append(SyncedStimulus(view, best))
+        self.spread.observe(last - first)
+        return result
@@ -0,0 +1,85 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# SELF IMPORTS
+from srg.utils import metrics as m
+
+
+class AdaptiveTimeouts:
+    """
+    Effective stimulus and boring timeout of one source for one robot.
+    In adaptive mode the boring timeout follows the source's observed
+    inter-arrival time (mean + k * deviation, clamped to the bounds) and
+    the stimulus timeout is capped to a fraction of it, so it can never
+    exceed the boring timeout. Otherwise, and until enough messages were
+    seen, the configured values are used.
+    """
+    def __init__(self, _robot, _inscope, _estimator, _stimulus_timeout, _boring_timeout,
+                 _k=6.0, _min_boring=0.2, _max_boring=2.0, _stimulus_fraction=0.5, _warmup=10):
+        self.estimator         = _estimator
+        self.static_stimulus   = float(_stimulus_timeout)
+        self.static_boring     = float(_boring_timeout)
+        self.k                 = float(_k)
+        self.min_boring        = float(_min_boring)
+        self.max_boring        = float(_max_boring)
+        self.stimulus_fraction = float(_stimulus_fraction)
+        self.warmup            = int(_warmup)
+        self.enabled           = False
+        self.stimulus_timeout  = self.static_stimulus
+        self.boring_timeout    = self.static_boring
+        labels = {"robot": _robot, "source": _inscope}
+        self.stimulus_gauge = m.REGISTRY.gauge("srg_stimulus_timeout_seconds", "Effective stimulus timeout", labels)
+        self.boring_gauge   = m.REGISTRY.gauge("srg_boring_timeout_seconds", "Effective boring timeout", labels)
+        self.stimulus_gauge.set(self.stimulus_timeout)
+        self.boring_gauge.set(self.boring_timeout)
+
+    @property
+    def learned(self):
+        return self.enabled and self.estimator.samples >= self.warmup
+
+    def update(self):
+        """
+        Derives the effective timeouts from the current estimate
+        :return (stimulus_timeout, boring_timeout)
+        """
+        if self.learned:
+            boring = self.estimator.deadline(self.k, self.min_boring, self.max_boring)
+            stimulus = min(self.static_stimulus, self.stimulus_fraction * boring)
+        else:
+            boring = self.static_boring
+            stimulus = self.static_stimulus
+        if boring != self.boring_timeout or stimulus != self.stimulus_timeout:
+            self.boring_timeout = boring
+            self.stimulus_timeout = stimulus
+            self.boring_gauge.set(boring)
+            self.stimulus_gauge.set(stimulus)
+        return stimulus, boring
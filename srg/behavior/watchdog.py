@@ -0,0 +1,157 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import time
+
+# SELF IMPORTS
+from srg.utils import metrics as m
+from srg.utils import tracing as tr
+from srg.utils import lifecycle as lc
+
+
+# Shedding levels, each level includes the ones below
+LEVELS = ["none", "gui", "decimate", "stages"]
+
+DEFAULTS = {"budget":     0.05,
+            "window":     1.0,
+            "recover":    0.7,
+            "hold":       2.0,
+            "interval":   0.25,
+            "decimation": 3,
+            "gui_rate":   10}
+
+
+class LatencyWatchdog(lc.StoppableThread):
+    """
+    Watches the stimulus to command latency of one robot against a budget.
+    If the p95 of the last "window" seconds exceeds the budget, load is
+    shed one level at a time: first the GUI refresh is throttled, then all
+    but the highest priority source are decimated, then the optional
+    instrumentation stages (tracing, motion latency) are switched off.
+    Only samples taken after the last level change count, and the next
+    level is shed at the earliest one "window" later, so every level gets
+    a full window to show its effect. Levels are restored one at a time
+    after the p95 stayed below "recover" * budget for "hold" seconds.
+    """
+    def __init__(self, _arbitration, _config=None):
+        lc.StoppableThread.__init__(self)
+        config = dict(DEFAULTS)
+        config.update(_config or {})
+        self.arbitration = _arbitration
+        self.name        = "watchdog %s" % _arbitration.outscope
+        self.budget      = float(config["budget"])
+        self.window      = float(config["window"])
+        self.recover     = float(config["recover"])
+        self.hold        = float(config["hold"])
+        self.interval    = float(config["interval"])
+        self.decimation  = max(1, int(config["decimation"]))
+        self.gui_rate    = float(config["gui_rate"])
+        self.level       = 0
+        self.good_since  = None
+        self.changed     = None
+        self.p95         = None
+        # What level 3 switched off, restored when leaving it
+        self.tracing     = False
+        self.gauge       = m.REGISTRY.gauge("srg_shed_level", "Load shedding level of the latency watchdog",
+                                            {"robot": _arbitration.outscope})
+        self.transitions = m.REGISTRY.counter("srg_shed_transitions_total", "Load shedding level changes",
+                                              {"robot": _arbitration.outscope})
+
+    def measure(self, _now):
+        """
+        :return p95 of the stimulus to command latency of all sources in the window, None without samples
+        """
+        values = []
+        since = _now - self.window
+        if self.changed is not None:
+            since = max(since, self.changed)
+        for view in self.arbitration.input_sources:
+            series = view.history.command_latency.snapshot()
+            values += [v for s, v in zip(series["stamps"], series["values"]) if s >= since]
+        if not values:
+            return None
+        values.sort()
+        return values[min(len(values) - 1, int(len(values) * 0.95))]
+
+    def check(self, _now):
+        self.p95 = self.measure(_now)
+        if self.p95 is not None and self.p95 > self.budget:
+            self.good_since = None
+            settled = self.changed is None or _now - self.changed >= self.window
+            if self.level < len(LEVELS) - 1 and settled:
+                self.transition(self.level + 1, _now)
+        elif self.level > 0:
+            # No samples count as recovered, nothing is waiting for a command
+            if self.p95 is not None and self.p95 > self.recover * self.budget:
+                self.good_since = None
+            elif self.good_since is None:
+                self.good_since = _now
+            elif _now - self.good_since >= self.hold:
+                self.good_since = _now
+                self.transition(self.level - 1, _now)
+        # Views of a reloaded config start undecimated, apply on every check
+        self.apply(self.level)
+
+    def transition(self, _level, _now):
+        print ">>> Latency p95 %s (budget %.0f ms), shedding %s --> %s for %s" % \
+              ("n/a" if self.p95 is None else "%.0f ms" % (self.p95 * 1000.0), self.budget * 1000.0,
+               LEVELS[self.level], LEVELS[_level], self.arbitration.outscope)
+        if _level >= 3 > self.level:
+            self.tracing = tr.TRACER.enabled
+        elif self.level >= 3 > _level and self.tracing:
+            tr.TRACER.enabled = True
+        self.level = _level
+        self.changed = _now
+        self.gauge.set(_level)
+        self.transitions.inc()
+
+    def apply(self, _level):
+        ar = self.arbitration
+        ar.shed_level = _level
+        ar.gui_rate = self.gui_rate if _level >= 1 else None
+        policy = ar.policy
+        first = policy.order[0] if policy is not None and policy.order else None
+        for idx, view in enumerate(ar.input_sources):
+            view.decimation = self.decimation if _level >= 2 and idx != first else 1
+        if _level >= 3:
+            tr.TRACER.enabled = False
+        if ar.latency is not None:
+            ar.latency.enabled = _level < 3
+
+    def run(self):
+        print ">>> Latency watchdog for %s, budget %.0f ms" % (self.arbitration.outscope, self.budget * 1000.0)
+        while not self.wait(self.interval):
+            self.check(time.time())
+        if self.level >= 3 and self.tracing:
+            tr.TRACER.enabled = True
+        self.apply(0)
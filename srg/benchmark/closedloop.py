@@ -0,0 +1,216 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import time
+import tempfile
+import threading
+from optparse import OptionParser
+
+# SELF IMPORTS
+from srg.behavior import arbitration as a
+from srg.middleware import local as l
+
+
+CONFIG = """
+priorities: [/bench/person]
+datatypes: [local:People]
+resolution: [320x240]
+fov: [66.0x40.0]
+modes: [absolute]
+stimulus_timeout: [0.0]
+boring_timeout: [1.0]
+allow_peak_override: [0]
+"""
+
+TRAJECTORY = """
+trajectory:
+  rate: %(rate)s
+  max_velocity: [120.0, 80.0]
+  max_acceleration: [600.0, 400.0]
+"""
+
+
+def write_config(_trajectory_rate):
+    """
+    Writes a config with one local People input, with a trajectory stage if _trajectory_rate is not None
+    :return path of the file
+    """
+    text = CONFIG
+    if _trajectory_rate is not None:
+        text += TRAJECTORY % {"rate": _trajectory_rate}
+    fd, path = tempfile.mkstemp(suffix=".yaml")
+    os.write(fd, text)
+    os.close(fd)
+    return path
+
+
+class StepFeeder(threading.Thread):
+    """
+    Feeds one person that jumps between two image positions every _hold seconds
+    """
+    def __init__(self, _source, _rate, _hold, _positions=((60.0, 120.0), (260.0, 120.0))):
+        threading.Thread.__init__(self)
+        self.name       = "step feeder"
+        self.source     = _source
+        self.period     = 1.0 / _rate
+        self.hold       = _hold
+        self.positions  = _positions
+        self.run_toggle = True
+        self.steps      = []
+
+    def run(self):
+        start = time.time()
+        current = None
+        while self.run_toggle:
+            now = time.time()
+            idx = int((now - start) / self.hold) % len(self.positions)
+            if idx != current:
+                current = idx
+                self.steps.append(now)
+            x, y = self.positions[idx]
+            self.source.feed_people(now, [(x, y, 40.0)])
+            time.sleep(self.period)
+
+
+class Sampler(threading.Thread):
+    """
+    Samples the simulated head's pan at a fixed rate
+    """
+    def __init__(self, _head, _rate=500.0):
+        threading.Thread.__init__(self)
+        self.name       = "sampler"
+        self.head       = _head
+        self.period     = 1.0 / _rate
+        self.run_toggle = True
+        self.samples    = []
+
+    def run(self):
+        while self.run_toggle:
+            self.samples.append((time.time(), self.head.pose[0]))
+            time.sleep(self.period)
+
+
+def step_response(_samples, _begin, _end, _tolerance):
+    """
+    :return (settling time in seconds, overshoot in percent of the step) or None for steps without motion
+    """
+    window = [(t, p) for t, p in _samples if _begin <= t < _end]
+    if len(window) < 10:
+        return None
+    start = window[0][1]
+    tail = window[-max(1, len(window) / 10):]
+    final = sum(p for t, p in tail) / len(tail)
+    step = final - start
+    if abs(step) < 1.0:
+        return None
+    band = max(_tolerance, 0.02 * abs(step))
+    settled = _begin
+    for t, p in window:
+        if abs(p - final) > band:
+            settled = t
+    peak = max((p - final) * (1.0 if step > 0 else -1.0) for t, p in window)
+    return settled - _begin, 100.0 * max(0.0, peak) / abs(step)
+
+
+def measure(_config, _outscope, _steps, _hold, _rate):
+    """
+    Runs the whole pipeline against a simulated head and steps the stimulus _steps times
+    :return (list of (settling, overshoot), commands per second received by the head)
+    """
+    ar = a.Arbitration(_config, _outscope, None, l.LocalControlConnector())
+    ar.read_yaml_config()
+    ar.boot_robot_driver()
+    ar.configure_middleware()
+    ar.wait_for_subscribers(5.0)
+    head = ar.rd.robot_controller
+    feeder = StepFeeder(ar.hub.sources["/bench/person"], _rate, _hold)
+    sampler = Sampler(head)
+    ar.start()
+    sampler.start()
+    feeder.start()
+    time.sleep(_hold * (_steps + 1))
+    feeder.run_toggle = False
+    feeder.join()
+    commands = head.count
+    elapsed = time.time() - feeder.steps[0]
+    sampler.run_toggle = False
+    sampler.join()
+    ar.stop()
+    results = []
+    # The first step starts from the initial pose, skip it
+    for n in xrange(1, len(feeder.steps)):
+        end = feeder.steps[n + 1] if n + 1 < len(feeder.steps) else feeder.steps[n] + _hold
+        response = step_response(sampler.samples, feeder.steps[n], end, 0.5)
+        if response is not None:
+            results.append(response)
+    return results, commands / elapsed
+
+
+def median(_values):
+    ordered = sorted(_values)
+    return ordered[len(ordered) / 2] if ordered else float("nan")
+
+
+def main(_argv):
+    parser = OptionParser(usage="Usage: %prog closedloop [options]")
+    parser.add_option("-n", "--steps", type="int", dest="steps", default=6,
+                      help="Stimulus steps per run. [Default: 6]")
+    parser.add_option("-d", "--hold", type="float", dest="hold", default=1.5,
+                      help="Seconds between two steps. [Default: 1.5]")
+    parser.add_option("-f", "--rate", type="float", dest="rate", default=30.0,
+                      help="Stimulus messages per second. [Default: 30]")
+    parser.add_option("-t", "--trajectory-rate", type="float", dest="trajectory_rate", default=100.0,
+                      help="Rate of the trajectory stage in the second run. [Default: 100]")
+    parser.add_option("-o", "--outscope", dest="outscope", default="sim://bench",
+                      help="Simulated head and its options, e.g., sim://bench?delay=0.05&damping=0.5")
+    (options, args) = parser.parse_args(_argv)
+
+    results = []
+    for label, rate in (("direct", None), ("trajectory", options.trajectory_rate)):
+        config = write_config(rate)
+        try:
+            results.append((label, measure(config, options.outscope, options.steps, options.hold, options.rate)))
+        finally:
+            os.remove(config)
+
+    print "---"
+    print ">>> Closed loop step response, %s, %d steps every %.1f s" % (options.outscope, options.steps, options.hold)
+    print ">>> %-10s | %12s %12s %12s %12s" % ("output", "settling ms", "max ms", "overshoot %", "commands/s")
+    for label, (responses, rate) in results:
+        settling = [s for s, o in responses]
+        overshoot = [o for s, o in responses]
+        print ">>> %-10s | %12.0f %12.0f %12.1f %12.1f" % (label, median(settling) * 1000.0,
+                                                          max(settling or [float("nan")]) * 1000.0,
+                                                          median(overshoot), rate)
+    print "---"
@@ -0,0 +1,177 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import time
+import random
+import tempfile
+import threading
+from optparse import OptionParser
+
+# SELF IMPORTS
+from srg.behavior import arbitration as a
+from srg.middleware import local as l
+from srg.utils import metrics as m
+
+
+CONFIG = """
+priorities: [/bench/primary, /bench/secondary]
+datatypes: [local:People, local:People]
+resolution: [320x240, 320x240]
+fov: [66.0x40.0, 66.0x40.0]
+modes: [absolute, absolute]
+stimulus_timeout: [0.0, 0.0]
+boring_timeout: [%(boring)s]
+allow_peak_override: [0]
+"""
+
+FAILOVER = """
+failover:
+  k: %(k)s
+  min_deadline: 0.05
+  max_deadline: 2.0
+  promote_after: 3
+"""
+
+
+def write_config(_boring, _k):
+    """
+    Writes a config with two local People inputs, failover enabled if _k is not None
+    :return path of the file
+    """
+    text = CONFIG % {"boring": _boring}
+    if _k is not None:
+        text += FAILOVER % {"k": _k}
+    fd, path = tempfile.mkstemp(suffix=".yaml")
+    os.write(fd, text)
+    os.close(fd)
+    return path
+
+
+class Feeder(threading.Thread):
+    """
+    Feeds both sources with jittered People messages, the primary one only while "primary" is set
+    """
+    def __init__(self, _primary, _secondary, _rate, _jitter):
+        threading.Thread.__init__(self)
+        self.name       = "feeder"
+        self.sources    = [_primary, _secondary]
+        self.period     = 1.0 / _rate
+        self.jitter     = _jitter
+        self.primary    = True
+        self.run_toggle = True
+
+    def run(self):
+        while self.run_toggle:
+            for source in self.sources:
+                if source is self.sources[0] and not self.primary:
+                    continue
+                source.feed_people(time.time(), [(random.uniform(0, 320), random.uniform(0, 240), 40.0)])
+            time.sleep(max(0.0, random.gauss(self.period, self.jitter * self.period)))
+
+
+def measure(_config, _trials, _rate, _jitter):
+    """
+    Silences the primary source _trials times and waits for the secondary one to win
+    :return (list of seconds from the last primary message until the switch, demotions)
+    """
+    before = demotions()
+    ar = a.Arbitration(_config, "local://failover", None, l.LocalControlConnector())
+    ar.read_yaml_config()
+    ar.boot_robot_driver()
+    ar.configure_middleware()
+    ar.wait_for_subscribers(5.0)
+    primary = ar.hub.sources["/bench/primary"]
+    feeder = Feeder(primary, ar.hub.sources["/bench/secondary"], _rate, _jitter)
+    ar.start()
+    feeder.start()
+    results = []
+    try:
+        for n in xrange(_trials):
+            feeder.primary = True
+            time.sleep(1.5)
+            feeder.primary = False
+            silent = time.time()
+            while ar.winner != 1 and time.time() - silent < 10.0:
+                time.sleep(0.001)
+            last = ar.input_sources[0].current_robot_gaze_arrival
+            results.append(time.time() - last)
+    finally:
+        feeder.run_toggle = False
+        feeder.join()
+        ar.request_stop()
+        ar.join()
+    return results, demotions() - before
+
+
+def demotions():
+    return sum(m.REGISTRY.counter("srg_demotions_total", "Sources demoted for missing their deadline",
+                                  {"source": inscope}).value for inscope in ("/bench/primary", "/bench/secondary"))
+
+
+def percentile(_values, _q):
+    ordered = sorted(_values)
+    return ordered[min(len(ordered) - 1, int(_q * len(ordered)))]
+
+
+def main(_argv):
+    parser = OptionParser(usage="Usage: %prog failover [options]")
+    parser.add_option("-n", "--trials", type="int", dest="trials", default=10,
+                      help="Number of times the primary source goes silent. [Default: 10]")
+    parser.add_option("-f", "--rate", type="float", dest="rate", default=30.0,
+                      help="Messages per second and source. [Default: 30]")
+    parser.add_option("-j", "--jitter", type="float", dest="jitter", default=0.2,
+                      help="Standard deviation of the message period, relative to the period. [Default: 0.2]")
+    parser.add_option("-b", "--boring", type="float", dest="boring", default=1.0,
+                      help="boring_timeout of both runs. [Default: 1.0]")
+    parser.add_option("-k", type="float", dest="k", default=4.0,
+                      help="Deviations added to the mean inter-arrival time. [Default: 4.0]")
+    (options, args) = parser.parse_args(_argv)
+
+    results = []
+    for label, k in (("boring timeout", None), ("failover", options.k)):
+        config = write_config(options.boring, k)
+        try:
+            results.append((label, measure(config, options.trials, options.rate, options.jitter)))
+        finally:
+            os.remove(config)
+
+    print "---"
+    print ">>> Failover time, 2 sources @ %.0f Hz, %d trials" % (options.rate, options.trials)
+    print ">>> %-14s | %10s %10s %10s %10s" % ("mode", "p50 ms", "p95 ms", "max ms", "demotions")
+    for label, (values, demoted) in results:
+        print ">>> %-14s | %10.1f %10.1f %10.1f %10d" % (label, percentile(values, 0.5) * 1000.0,
+                                                      percentile(values, 0.95) * 1000.0, max(values) * 1000.0,
+                                                      demoted)
+    print ">>> Demotions above the number of trials were spurious"
+    print "---"
@@ -0,0 +1,113 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import math
+import time
+from optparse import OptionParser
+
+# HLRC IMPORTS
+from hlrc_client import RobotGaze
+
+# SELF IMPORTS
+from srg.robot import driver as d
+from srg.robot import udp as u
+
+
+def stats(_values):
+    """
+    :return (mean, p50, p99, standard deviation) in milliseconds
+    """
+    ordered = sorted(_values)
+    n = len(ordered)
+    mean = sum(ordered) / n
+    deviation = math.sqrt(sum((v - mean) ** 2 for v in ordered) / n)
+    return (mean * 1000.0, ordered[n / 2] * 1000.0, ordered[min(n - 1, int(n * 0.99))] * 1000.0,
+            deviation * 1000.0)
+
+
+def measure(_outscope, _commands, _rate):
+    """
+    Sends _commands gaze targets through a RobotDriver, blocking like the GazeController does
+    :return list of set_gaze_target durations in seconds
+    """
+    driver = d.RobotDriver("ROS", _outscope)
+    g = RobotGaze()
+    g.gaze_type = RobotGaze.GAZETARGET_ABSOLUTE
+    period = 1.0 / _rate
+    durations = []
+    for n in xrange(_commands):
+        g.pan = 10.0 * math.sin(n * 0.05)
+        g.tilt = 5.0 * math.cos(n * 0.05)
+        then = time.time()
+        driver.set_gaze_target(g, True)
+        durations.append(time.time() - then)
+        rest = period - (time.time() - then)
+        if rest > 0:
+            time.sleep(rest)
+    driver.request_stop()
+    return durations
+
+
+def main(_argv):
+    parser = OptionParser(usage="Usage: %prog output [options]")
+    parser.add_option("-n", "--commands", type="int", dest="commands", default=2000,
+                      help="Gaze commands per output. [Default: 2000]")
+    parser.add_option("-f", "--rate", type="float", dest="rate", default=100.0,
+                      help="Commands per second. [Default: 100]")
+    parser.add_option("-p", "--port", type="int", dest="port", default=0,
+                      help="UDP port of the receiver stand-in, 0 picks a free one. [Default: 0]")
+    parser.add_option("-o", "--hlrc-outscope", dest="hlrc", default=None,
+                      help="Also measure the HLRC path to this outscope, needs a running robot or HLRC server.")
+    (options, args) = parser.parse_args(_argv)
+
+    receiver = u.UdpReceiver(options.port)
+    receiver.start()
+    results = [("udp call", measure("udp://127.0.0.1:%d" % receiver.address[1], options.commands, options.rate))]
+    time.sleep(0.1)
+    receiver.request_stop()
+    receiver.join(1.0)
+    one_way = receiver.latency.sum / max(1, receiver.latency.count)
+    if options.hlrc is not None:
+        results.append(("hlrc call", measure(options.hlrc, options.commands, options.rate)))
+
+    print "---"
+    print ">>> Command latency, %d commands @ %.0f Hz" % (options.commands, options.rate)
+    print ">>> %-10s | %9s %9s %9s %10s" % ("output", "mean ms", "p50 ms", "p99 ms", "jitter ms")
+    for label, durations in results:
+        print ">>> %-10s | %9.3f %9.3f %9.3f %10.3f" % ((label,) + stats(durations))
+    print ">>> udp send to receive: mean %.3f ms, p99 <= %.3f ms, %d received, %d lost, %d reordered" % \
+          (one_way * 1000.0, receiver.latency.quantile(0.99) * 1000.0, receiver.count, receiver.lost,
+           receiver.reordered)
+    if options.hlrc is None:
+        print ">>> HLRC path not measured, pass --hlrc-outscope /robot with the robot or its HLRC server running"
+    print "---"
@@ -0,0 +1,174 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import time
+import random
+import tempfile
+import threading
+from optparse import OptionParser
+
+# SELF IMPORTS
+from srg.behavior import arbitration as a
+from srg.middleware import local as l
+from srg.middleware import stimulus as st
+
+
+CONFIG = """
+priorities: [%(priorities)s]
+datatypes: [%(datatypes)s]
+resolution: [%(resolution)s]
+fov: [%(fov)s]
+modes: [%(modes)s]
+stimulus_timeout: [%(timeouts)s]
+boring_timeout: [1.0]
+allow_peak_override: [0]
+"""
+
+
+def write_config(_sources):
+    """
+    Writes a config with _sources local People inputs to a temporary file
+    :return path of the file
+    """
+    values = {"priorities": ", ".join("/bench/source%d" % n for n in xrange(_sources)),
+              "datatypes":  ", ".join(["local:People"] * _sources),
+              "resolution": ", ".join(["320x240"] * _sources),
+              "fov":        ", ".join(["66.0x40.0"] * _sources),
+              "modes":      ", ".join(["absolute"] * _sources),
+              "timeouts":   ", ".join(["0.0"] * _sources)}
+    fd, path = tempfile.mkstemp(suffix=".yaml")
+    os.write(fd, CONFIG % values)
+    os.close(fd)
+    return path
+
+
+def cpu_time():
+    t = os.times()
+    return t[0] + t[1]
+
+
+class Feeder(threading.Thread):
+    """
+    Feeds synthetic People messages with a few persons into local sources
+    """
+    def __init__(self, _sources, _rate, _people=5):
+        threading.Thread.__init__(self)
+        self.name       = "feeder"
+        self.sources    = _sources
+        self.period     = 1.0 / _rate
+        self.people     = _people
+        self.run_toggle = True
+        self.fed        = 0
+
+    def run(self):
+        while self.run_toggle:
+            then = time.time()
+            for source in self.sources:
+                positions = [(random.uniform(0, 320), random.uniform(0, 240), random.uniform(10, 80))
+                             for n in xrange(self.people)]
+                source.feed_people(time.time(), positions)
+                self.fed += 1
+            rest = self.period - (time.time() - then)
+            if rest > 0:
+                time.sleep(rest)
+
+
+def measure(_config, _robots, _shared, _duration, _rate):
+    """
+    Runs _robots Arbitrations on local sources and a local robot driver
+    :param _shared True: all robots share one SourceHub, False: one hub per
+                   robot, i.e., every robot receives and decodes on its own
+    :return (cpu percent of one core, commands sent)
+    """
+    shared_hub = st.SourceHub()
+    robots = []
+    for n in xrange(_robots):
+        hub = shared_hub if _shared else st.SourceHub()
+        ar = a.Arbitration(_config, "local://robot%d" % n, hub, l.LocalControlConnector())
+        ar.read_yaml_config()
+        ar.boot_robot_driver()
+        ar.configure_middleware()
+        ar.wait_for_subscribers(5.0)
+        robots.append(ar)
+    hubs = [shared_hub] if _shared else [ar.hub for ar in robots]
+    sources = [source for hub in hubs for source in hub.sources.values()]
+    for ar in robots:
+        ar.start()
+    feeder = Feeder(sources, _rate)
+    feeder.start()
+    wall = time.time()
+    cpu = cpu_time()
+    time.sleep(_duration)
+    cpu = cpu_time() - cpu
+    wall = time.time() - wall
+    feeder.run_toggle = False
+    feeder.join()
+    commands = sum(ar.rd.robot_controller.count for ar in robots)
+    for ar in robots:
+        ar.request_stop()
+    for hub in hubs:
+        hub.request_stop()
+    for ar in robots:
+        ar.join()
+    return 100.0 * cpu / wall, commands
+
+
+def main(_argv):
+    parser = OptionParser(usage="Usage: %prog robots [options]")
+    parser.add_option("-r", "--max-robots", type="int", dest="max_robots", default=4,
+                      help="Measure 1..N robots. [Default: 4]")
+    parser.add_option("-s", "--sources", type="int", dest="sources", default=2,
+                      help="Input sources per robot. [Default: 2]")
+    parser.add_option("-f", "--rate", type="float", dest="rate", default=30.0,
+                      help="Messages per second and source. [Default: 30]")
+    parser.add_option("-d", "--duration", type="float", dest="duration", default=5.0,
+                      help="Seconds per measurement. [Default: 5]")
+    (options, args) = parser.parse_args(_argv)
+
+    config = write_config(options.sources)
+    results = []
+    try:
+        for robots in xrange(1, options.max_robots + 1):
+            shared = measure(config, robots, True, options.duration, options.rate)
+            separate = measure(config, robots, False, options.duration, options.rate)
+            results.append((robots, shared, separate))
+    finally:
+        os.remove(config)
+
+    print "---"
+    print ">>> CPU use, %d sources @ %.0f Hz, %.0f s per run" % (options.sources, options.rate, options.duration)
+    print ">>> %6s | %14s %10s | %14s %10s" % ("robots", "shared cpu %", "commands", "separate cpu %", "commands")
+    for robots, shared, separate in results:
+        print ">>> %6d | %14.1f %10d | %14.1f %10d" % (robots, shared[0], shared[1], separate[0], separate[1])
+    print "---"
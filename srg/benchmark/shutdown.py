@@ -0,0 +1,105 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import time
+from optparse import OptionParser
+
+# SELF IMPORTS
+from srg.behavior import arbitration as a
+from srg.benchmark import robots as rb
+from srg.middleware import local as l
+from srg.middleware import stimulus as st
+from srg.utils import lifecycle as lc
+
+
+def measure(_config, _robots, _rate, _timeout):
+    """
+    Starts _robots Arbitrations on shared local sources, runs them for a
+    moment and shuts everything down like bin/simple_robot_gaze does
+    :return (seconds until all threads were joined, threads still alive)
+    """
+    hub = st.SourceHub()
+    robots = []
+    for n in xrange(_robots):
+        ar = a.Arbitration(_config, "local://robot%d" % n, hub, l.LocalControlConnector())
+        ar.read_yaml_config()
+        ar.boot_robot_driver()
+        ar.configure_middleware()
+        ar.wait_for_subscribers(5.0)
+        robots.append(ar)
+    for ar in robots:
+        ar.start()
+    feeder = rb.Feeder(hub.sources.values(), _rate)
+    feeder.start()
+    time.sleep(0.5)
+    feeder.run_toggle = False
+    feeder.join()
+    then = time.time()
+    for ar in robots:
+        ar.request_stop()
+    hub.request_stop()
+    threads = [thread for ar in robots for thread in [ar] + ar.components()] + hub.running()
+    alive = lc.join_all(threads, _timeout)
+    return time.time() - then, len(alive)
+
+
+def main(_argv):
+    parser = OptionParser(usage="Usage: %prog shutdown [options]")
+    parser.add_option("-n", "--trials", type="int", dest="trials", default=10,
+                      help="Number of start/stop cycles. [Default: 10]")
+    parser.add_option("-r", "--robots", type="int", dest="robots", default=2,
+                      help="Robots per cycle. [Default: 2]")
+    parser.add_option("-s", "--sources", type="int", dest="sources", default=3,
+                      help="Input sources. [Default: 3]")
+    parser.add_option("-f", "--rate", type="float", dest="rate", default=30.0,
+                      help="Messages per second and source. [Default: 30]")
+    parser.add_option("-t", "--timeout", type="float", dest="timeout", default=2.0,
+                      help="Join timeout. [Default: 2.0]")
+    (options, args) = parser.parse_args(_argv)
+
+    config = rb.write_config(options.sources)
+    results = []
+    try:
+        for n in xrange(options.trials):
+            results.append(measure(config, options.robots, options.rate, options.timeout))
+    finally:
+        os.remove(config)
+
+    durations = sorted(duration for duration, alive in results)
+    print "---"
+    print ">>> Shutdown time, %d robots, %d sources, %d cycles" % (options.robots, options.sources, options.trials)
+    print ">>> p50 %.1f ms, max %.1f ms, threads not joined: %d" % (durations[len(durations) / 2] * 1000.0,
+                                                                  durations[-1] * 1000.0,
+                                                                  sum(alive for duration, alive in results))
+    print "---"
@@ -0,0 +1,210 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import gc
+import sys
+import time
+import random
+import resource
+import threading
+from optparse import OptionParser
+
+# Python 3.4+, or Python 2 with pytracemalloc, else the resident set size is watched
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# SELF IMPORTS
+from srg.behavior import arbitration as a
+from srg.benchmark import robots as rb
+from srg.middleware import local as l
+
+
+class SoakFeeder(threading.Thread):
+    """
+    Feeds synthetic People messages into all sources of a hub, the sources
+    are looked up per round, so reloads that replace sources are followed
+    """
+    def __init__(self, _hub, _rate, _people=5):
+        threading.Thread.__init__(self)
+        self.name       = "soak feeder"
+        self.daemon     = True
+        self.hub        = _hub
+        self.period     = 1.0 / _rate
+        self.people     = _people
+        self.run_toggle = True
+        self.fed        = 0
+
+    def run(self):
+        next_round = time.time()
+        while self.run_toggle:
+            for source in self.hub.sources.values():
+                positions = [(random.uniform(0, 320), random.uniform(0, 240), random.uniform(10, 80))
+                             for n in xrange(self.people)]
+                source.feed_people(time.time(), positions)
+                self.fed += 1
+            next_round += self.period
+            rest = next_round - time.time()
+            if rest > 0:
+                time.sleep(rest)
+            else:
+                next_round = time.time()
+
+
+def memory():
+    """
+    :return bytes in use, traced by tracemalloc if it runs, else the resident set size
+    """
+    gc.collect()
+    if tracemalloc is not None and tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        f = open("/proc/self/statm")
+        try:
+            return int(f.read().split()[1]) * resource.getpagesize()
+        finally:
+            f.close()
+    except IOError:
+        # Peak, not current, in kilobytes on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def churn(_ar, _control, _config, _sources, _n):
+    """
+    Exercises the paths that allocate outside the message flow: reloads
+    that add and remove a source, policy changes, pause and resume
+    """
+    rb_config = rb.write_config(_sources - 1 if _n % 2 == 0 else _sources)
+    os.rename(rb_config, _config)
+    _ar.reload_config()
+    _control.send("force /bench/source0")
+    _control.send("release")
+    _control.send("pause")
+    _control.send("resume")
+
+
+def main(_argv):
+    parser = OptionParser(usage="Usage: %prog soak [options]")
+    parser.add_option("--hours", type="float", dest="hours", default=4.0,
+                      help="Simulated duration in hours. [Default: 4]")
+    parser.add_option("-x", "--speedup", type="float", dest="speedup", default=60.0,
+                      help="Clock compression of the input messages and the churn, the arbitration and "
+                           "gaze loops keep their real rates. [Default: 60]")
+    parser.add_option("-s", "--sources", type="int", dest="sources", default=3,
+                      help="Input sources. [Default: 3]")
+    parser.add_option("-f", "--rate", type="float", dest="rate", default=30.0,
+                      help="Simulated messages per second and source. [Default: 30]")
+    parser.add_option("--interval", type="float", dest="interval", default=10.0,
+                      help="Simulated minutes between two snapshots. [Default: 10]")
+    parser.add_option("--churn", type="float", dest="churn", default=15.0,
+                      help="Simulated minutes between two reloads and policy changes, 0 disables. [Default: 15]")
+    parser.add_option("--warmup", type="float", dest="warmup", default=10.0,
+                      help="Simulated minutes before the baseline snapshot. [Default: 10]")
+    parser.add_option("--max-growth", type="float", dest="max_growth", default=10.0,
+                      help="Allowed memory growth over the baseline in MB. [Default: 10]")
+    parser.add_option("--max-threads", type="int", dest="max_threads", default=2,
+                      help="Allowed thread count growth over the baseline. [Default: 2]")
+    (options, args) = parser.parse_args(_argv)
+
+    if tracemalloc is not None:
+        tracemalloc.start(10)
+    config = rb.write_config(options.sources)
+    control = l.LocalControlConnector()
+    ar = a.Arbitration(config, "local://soak", None, control)
+    ar.read_yaml_config()
+    ar.boot_robot_driver()
+    ar.configure_middleware()
+    ar.wait_for_subscribers(5.0)
+    ar.start()
+    feeder = SoakFeeder(ar.hub, options.rate * options.speedup)
+    feeder.start()
+
+    # Simulated seconds on the compressed clock, it paces the feeder, the
+    # churn and the snapshots only. The arbitration, gaze controller and
+    # watchdog loops and the stimulus timeouts run on the real clock.
+    duration = options.hours * 3600.0
+    start = time.time()
+    simulated = lambda: (time.time() - start) * options.speedup
+    next_snapshot = options.warmup * 60.0
+    next_churn = options.churn * 60.0 if options.churn > 0 else None
+    churns = 0
+    baseline = None
+    failures = []
+    print "---"
+    print ">>> Soak test, %.1f h simulated in %.1f min, memory from %s" % \
+          (options.hours, duration / options.speedup / 60.0,
+           "tracemalloc" if tracemalloc is not None else "the resident set size")
+    print ">>> %8s | %10s %10s %8s %10s" % ("sim h", "memory MB", "growth MB", "threads", "messages")
+    try:
+        while simulated() < duration and not failures:
+            now = simulated()
+            if next_churn is not None and now >= next_churn:
+                churn(ar, control, config, options.sources, churns)
+                churns += 1
+                next_churn += options.churn * 60.0
+            if now >= next_snapshot:
+                next_snapshot += options.interval * 60.0
+                used = memory()
+                threads = threading.active_count()
+                if baseline is None:
+                    snapshot = tracemalloc.take_snapshot() if tracemalloc is not None else None
+                    baseline = (used, threads, snapshot)
+                growth = (used - baseline[0]) / 1048576.0
+                print ">>> %8.2f | %10.1f %10.1f %8d %10d" % (now / 3600.0, used / 1048576.0, growth, threads,
+                                                            feeder.fed)
+                if growth > options.max_growth:
+                    failures.append("memory grew by %.1f MB" % growth)
+                if threads > baseline[1] + options.max_threads:
+                    failures.append("thread count grew from %d to %d" % (baseline[1], threads))
+            time.sleep(0.05)
+    finally:
+        feeder.run_toggle = False
+        feeder.join()
+        alive = ar.stop()
+        os.remove(config)
+
+    print "---"
+    if alive:
+        failures.append("threads not joined on exit: %s" % ", ".join(thread.name for thread in alive))
+    if failures and tracemalloc is not None and baseline is not None:
+        print ">>> Largest allocations since the baseline:"
+        for stat in tracemalloc.take_snapshot().compare_to(baseline[2], "lineno")[:10]:
+            print ">>>   %s" % stat
+    for failure in failures:
+        print ">>> FAIL: %s" % failure
+    if failures:
+        sys.exit(1)
+    print ">>> PASS: %d messages, %d reloads" % (feeder.fed, churns)
+    print "---"
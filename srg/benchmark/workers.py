@@ -0,0 +1,108 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import time
+import multiprocessing
+from optparse import OptionParser
+
+# SELF IMPORTS
+from srg.middleware import stimulus as st
+
+
+class CountingView:
+    """
+    Stands in for a robot's StimulusView, only counts stimuli
+    """
+    def __init__(self, _source):
+        self.source = _source
+        self.count  = 0
+        _source.add_view(self)
+
+    @property
+    def ready(self):
+        return self.source.ready
+
+    def update(self, _stamp, _x, _y, _z, _arrival, _mono, _delay):
+        self.count += 1
+
+
+def measure(_sources, _worker, _rate, _work, _duration):
+    """
+    Runs _sources synthetic heavy sources either as threads or as worker processes
+    :return stimuli per second that reached the arbitration process
+    """
+    hub = st.SourceHub()
+    views = []
+    for n in xrange(_sources):
+        source = hub.source("/bench/heavy%d" % n, "synthetic", "People", {"rate": _rate, "work": _work}, _worker)
+        views.append(CountingView(source))
+    hub.start()
+    deadline = time.time() + 10.0
+    while not all(v.ready for v in views) and time.time() < deadline:
+        time.sleep(0.01)
+    before = sum(v.count for v in views)
+    then = time.time()
+    time.sleep(_duration)
+    received = sum(v.count for v in views) - before
+    elapsed = time.time() - then
+    hub.request_stop()
+    for source in hub.sources.values():
+        source.join()
+    return received / elapsed
+
+
+def main(_argv):
+    parser = OptionParser(usage="Usage: %prog workers [options]")
+    parser.add_option("-c", "--max-cores", type="int", dest="max_cores", default=8,
+                      help="Measure 1..N heavy sources, capped at the available cores. [Default: 8]")
+    parser.add_option("-f", "--rate", type="float", dest="rate", default=200.0,
+                      help="Requested messages per second and source. [Default: 200]")
+    parser.add_option("-w", "--work", type="int", dest="work", default=50000,
+                      help="Loop iterations per message emulating detection/tracking cost. [Default: 50000]")
+    parser.add_option("-d", "--duration", type="float", dest="duration", default=5.0,
+                      help="Seconds per measurement. [Default: 5]")
+    (options, args) = parser.parse_args(_argv)
+
+    cores = min(options.max_cores, multiprocessing.cpu_count())
+    results = []
+    for n in xrange(1, cores + 1):
+        threads = measure(n, False, options.rate, options.work, options.duration)
+        workers = measure(n, True, options.rate, options.work, options.duration)
+        results.append((n, threads, workers))
+
+    print "---"
+    print ">>> Ingestion throughput, %.0f Hz requested per source, %d work iterations per message" % (options.rate, options.work)
+    print ">>> %7s | %12s | %12s | %7s" % ("sources", "threads 1/s", "workers 1/s", "speedup")
+    for n, threads, workers in results:
+        print ">>> %7d | %12.1f | %12.1f | %7.2f" % (n, threads, workers, workers / max(threads, 1e-9))
+    print "---"
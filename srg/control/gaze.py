@@ -32,10 +32,14 @@ Authors: Florian Lier, Simon Schulz
 
 # STD IMPORTS
 import time
-import threading
 
+# SELF IMPORTS
+from srg.utils import metrics as m
+from srg.utils import tracing as tr
+from srg.utils import lifecycle as lc
 
-class GazeController(threading.Thread):
+
+class GazeController(lc.StoppableThread):
     """
     The GazeController receives person messages (ROS) and derives
     the nearest person identified. Based on this, the robot's
@@ -43,14 +47,20 @@ class GazeController(threading.Thread):
     class below
     """
     def __init__(self, _robot_controller, _mw, _lock):
-        threading.Thread.__init__(self)
+        lc.StoppableThread.__init__(self)
         self.lock         = _lock
         self.mw           = _mw
-        self.run_toggle   = True
+        self.name         = "controller %s" % _mw.inscope
         self.acquire_prio = False
+        # Optional MotionLatencyTracker, set by the Arbitration
+        self.latency      = None
         self.lastdatum    = time.time()
         self.rc           = _robot_controller
         self.loop_speed   = 1.0
+        self.send_latency = m.REGISTRY.histogram("srg_command_send_seconds", "Duration of set_gaze_target calls",
+                                                 {"source": self.mw.inscope})
+        self.sent         = m.REGISTRY.counter("srg_commands_sent_total", "Gaze commands sent to the robot",
+                                               {"source": self.mw.inscope})
 
     def run(self):
         print ">>> Initializing Gaze Controller for: %s --> %s" % (self.mw.inscope.strip(), self.rc.outscope.strip())
@@ -60,11 +70,23 @@ class GazeController(threading.Thread):
             then = time.time()
             tick = time.time()
             self.lock.acquire()
+            locked = time.time()
             if self.mw.current_robot_gaze is not None and self.lastdatum != self.mw.current_robot_gaze_timestamp:
                 self.lastdatum = self.mw.current_robot_gaze_timestamp
                 current_target = self.mw.current_robot_gaze
                 if self.acquire_prio:
-                    self.rc.robot_controller.set_gaze_target(current_target, True)
+                    send_start = time.time()
+                    self.rc.set_gaze_target(current_target, True)
+                    send_end = time.time()
+                    self.send_latency.observe(send_end - send_start)
+                    if tr.TRACER.enabled:
+                        tr.TRACER.span("lock_wait", then, locked, self.lastdatum)
+                        tr.TRACER.span("set_gaze_target", send_start, send_end, self.lastdatum)
+                    self.sent.inc()
+                    self.mw.history.add_command(send_end, current_target.pan, current_target.tilt,
+                                                send_end - self.mw.current_robot_gaze_arrival)
+                    if self.latency is not None:
+                        self.latency.command(self.mw, current_target, send_end)
                     loop_count += 1
                 self.lock.release()
             else:
@@ -77,5 +99,5 @@ class GazeController(threading.Thread):
                 loop_count = 0
                 init_time = time.time()
             if hz > 0:
-                time.sleep(hz)
+                self.wait(hz)
         print ">>> Deactivating Gaze Controller for: %s" % self.rc.outscope.strip()
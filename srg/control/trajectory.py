@@ -0,0 +1,141 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import math
+import time
+
+# HLRC IMPORTS
+from hlrc_client import RobotGaze
+from hlrc_client import RobotTimestamp
+
+# SELF IMPORTS
+from srg.utils import metrics as m
+from srg.utils import lifecycle as lc
+
+
+class TrajectoryGenerator(lc.StoppableThread):
+    """
+    Output stage between the GazeControllers and the RobotDriver. Keeps a
+    velocity and acceleration limited trajectory (per axis) towards the
+    latest target and sends interpolated absolute RobotGaze commands at a
+    fixed rate. A new target only changes where the trajectory goes, the
+    current velocity is kept, so retargeting never stops the head.
+    Offers the same set_gaze_target/outscope interface as the RobotDriver.
+    """
+    def __init__(self, _driver, _rate=100.0, _max_velocity=(120.0, 80.0), _max_acceleration=(600.0, 400.0),
+                 _joint_history=None):
+        lc.StoppableThread.__init__(self)
+        self.driver           = _driver
+        self.outscope         = _driver.outscope
+        self.name             = "trajectory %s" % self.outscope
+        self.period           = 1.0 / float(_rate)
+        self.max_velocity     = [float(v) for v in _max_velocity]
+        self.max_acceleration = [float(a) for a in _max_acceleration]
+        self.joint_history    = _joint_history
+        self.position         = None
+        self.velocity         = [0.0, 0.0]
+        self.target           = None
+        self.stamp            = None
+        self.settled          = True
+        self.commands         = m.REGISTRY.counter("srg_trajectory_commands_total", "Interpolated gaze commands sent",
+                                                   {"robot": self.outscope})
+
+    def set_gaze_target(self, _gaze, _blocking=True):
+        if self.position is None:
+            pose = self.joint_history.latest() if self.joint_history is not None else None
+            self.position = list(pose) if pose is not None else [0.0, 0.0]
+        if _gaze.gaze_type == RobotGaze.GAZETARGET_RELATIVE:
+            self.target = [self.position[0] + _gaze.pan, self.position[1] + _gaze.tilt]
+        else:
+            self.target = [_gaze.pan, _gaze.tilt]
+        self.stamp = _gaze.gaze_timestamp
+        self.settled = False
+
+    def step_axis(self, _axis, _target, _dt):
+        """
+        Accelerates towards the velocity that still allows stopping at the target
+        """
+        vmax = self.max_velocity[_axis]
+        amax = self.max_acceleration[_axis]
+        error = _target - self.position[_axis]
+        desired = math.copysign(min(vmax, math.sqrt(2.0 * amax * abs(error))), error)
+        dv = max(-amax * _dt, min(amax * _dt, desired - self.velocity[_axis]))
+        self.velocity[_axis] += dv
+        step = self.velocity[_axis] * _dt
+        # Do not overshoot because of the discrete time step
+        if abs(step) >= abs(error) and step * error >= 0:
+            self.position[_axis] = _target
+            self.velocity[_axis] = 0.0
+            return True
+        self.position[_axis] += step
+        return False
+
+    def step(self, _target, _dt):
+        done_pan = self.step_axis(0, _target[0], _dt)
+        done_tilt = self.step_axis(1, _target[1], _dt)
+        return done_pan and done_tilt
+
+    def send(self):
+        g = RobotGaze()
+        g.gaze_type = RobotGaze.GAZETARGET_ABSOLUTE
+        g.gaze_timestamp = self.stamp if self.stamp is not None else RobotTimestamp(time.time())
+        g.pan = self.position[0]
+        g.tilt = self.position[1]
+        self.driver.set_gaze_target(g, False)
+        self.commands.inc()
+
+    def run(self):
+        print ">>> Initializing Trajectory Generator for: %s @ %.0f Hz" % (self.outscope, 1.0 / self.period)
+        next_tick = time.time()
+        last = next_tick
+        while self.run_toggle is True:
+            next_tick += self.period
+            rest = next_tick - time.time()
+            if rest > 0:
+                if self.wait(rest):
+                    break
+            else:
+                # Fell behind, do not try to catch up with a burst of commands
+                next_tick = time.time()
+            now = time.time()
+            dt = now - last
+            last = now
+            target = self.target
+            if self.settled or target is None:
+                continue
+            done = self.step(target, dt)
+            # A new target may have arrived meanwhile, keep going then
+            if done and target is self.target:
+                self.settled = True
+            self.send()
+        print ">>> Deactivating Trajectory Generator for: %s" % self.outscope
@@ -39,50 +39,31 @@ from PyQt4.QtCore import *
 from srg.middleware import ros as r
 
 
-class LabelThread(QThread):
-    def __init__(self, _targets, _activities):
-        QThread.__init__(self)
-        self.targets = _targets
-        self.bars = _activities
-
-    def __del__(self):
-        self.wait()
-
-    def run(self):
-        while True:
-            fake = "None"
-            self.emit(SIGNAL('set_control_data(QString)'), str(fake))
-            self.msleep(40)
-
-
-class BarsThread(QThread):
-    def __init__(self, _targets, _activities):
-        QThread.__init__(self)
-        self.targets = _targets
-        self.bars = _activities
-
-    def __del__(self):
-        self.wait()
-
-    def run(self):
-        while True:
-            fake = "fake"
-            self.emit(SIGNAL('set_bar_values(QString)'), str(fake))
-            self.msleep(500)
+# Redraws are capped at the display refresh rate
+DEFAULT_REFRESH_RATE = 60
 
 
 class Viz(QtGui.QWidget):
-    def __init__(self, _input_source, _gaze_controller, _arbitration):
+    """
+    Draws the versioned state published by the Arbitration. A timer in
+    the GUI thread picks up new versions and only widgets whose value
+    changed are touched. Controllers, connectors and their locks are
+    never accessed from here.
+    """
+    def __init__(self, _arbitration, _refresh_rate=DEFAULT_REFRESH_RATE):
         super(Viz, self).__init__()
 
         self.arbitration = _arbitration
-        self.input_sources = _input_source
-        self.gaze_controller = _gaze_controller
+        self.refresh_rate = _refresh_rate
+        self.full_refresh_rate = _refresh_rate
 
         self.tc = r.ToggleConnector()
         self.is_paused = False
         self.run_toggle = True
 
+        self.drawn_version = 0
+        self.drawn = {}
+
         self.font = QtGui.QFont()
         self.font.setPointSize(12)
         self.font.setBold(True)
@@ -110,7 +91,7 @@ class Viz(QtGui.QWidget):
         self.ccs_label.setStyleSheet('color: darkblue')
         self.layout.addWidget(self.ccs_label)
 
-        self.loop_label = QtGui.QLabel("SRG Main Loop @ " + str(self.arbitration.loop_speed) + " Hz")
+        self.loop_label = QtGui.QLabel("SRG Main Loop @ 0 Hz")
         self.loop_label.setFont(self.font_smaller)
         self.layout.addWidget(self.loop_label)
 
@@ -124,120 +105,101 @@ class Viz(QtGui.QWidget):
         self.layout.addWidget(self.h_line)
         self.layout.addWidget(self.h_line)
 
-        self.current_targets = {}
         self.current_activity = {}
         self.info_labels = {}
         self.loop_labels = {}
-        self.maxima = {}
-        self.last_values = {}
+        self.timeout_labels = {}
 
-        for gc in self.gaze_controller:
-            name = gc.mw.inscope
-            self.maxima[name] = gc.mw.trans.fov
-            self.last_values[name] = [0.0, 0.0]
+        # Static configuration only, names and field of view
+        for name, fov in self.arbitration.source_info():
             self.info_labels[name] = QtGui.QLabel(name)
             self.info_labels[name].setFont(self.font_smaller_c)
             self.loop_labels[name] = QtGui.QLabel(name)
             self.loop_labels[name].setFont(self.font_smaller_c)
+            self.timeout_labels[name] = QtGui.QLabel(name)
+            self.timeout_labels[name].setFont(self.font_smaller_c)
 
             self.current_activity[name] = QtGui.QProgressBar()
-            self.current_activity[name].setMaximum((gc.mw.trans.fov[0]/2)+(gc.mw.trans.fov[1]/2))
+            self.current_activity[name].setMaximum((fov[0]/2)+(fov[1]/2))
             self.current_activity[name].setMinimum(0)
             self.current_activity[name].setAlignment(Qt.AlignCenter)
             self.current_activity[name].setFormat('Activity')
             self.current_activity[name].setFont(self.font_smaller_c)
 
-        for label in self.info_labels:
-            self.layout.addWidget(self.loop_labels[label])
-            self.layout.addWidget(self.info_labels[label])
-            self.layout.addWidget(self.current_activity[label])
+            self.layout.addWidget(self.loop_labels[name])
+            self.layout.addWidget(self.info_labels[name])
+            self.layout.addWidget(self.timeout_labels[name])
+            self.layout.addWidget(self.current_activity[name])
             self.layout.addWidget(self.h_line)
             self.layout.addWidget(self.h_line)
             self.layout.addWidget(self.h_line)
 
-        if self.arbitration.winner is not None:
-            self.ccs_label.setText("Current Control Input << " + self.input_sources[self.arbitration.winner].inscope)
-
-            for gc in self.gaze_controller:
-                if gc.mw.current_robot_gaze is not None:
-                    self.current_targets[gc.mw.inscope] = [ int(gc.mw.current_robot_gaze.pan), int(gc.mw.current_robot_gaze.tilt) ]
-                    self.loop_labels[name].setText("'Set Gaze' Loop for: " + name + " @ " + str(gc.loop_speed) + " Hz")
-                else:
-                    self.current_targets[gc.mw.inscope] = [ -1, -1 ]
-
-            for name in self.current_targets.keys():
-                self.info_labels[name].setText("Calculated Gaze Targets for: " + name + " " + str(self.current_targets[name]) + " @ Degrees " )
-
-            if self.arbitration.is_override:
-                self.override_button.setText("Override: " + self.arbitration.override_type)
-                self.override_button.setChecked(True)
-            else:
-                self.override_button.setChecked(False)
-                self.override_button.setText("Override: Negative!")
-
         self.pause_button = QPushButton('Pause Simple Robot Gaze', self)
         self.pause_button.clicked.connect(self.pause)
         self.layout.addWidget(self.pause_button)
 
-        self.get_bars_thread = None
-        self.get_label_thread = None
+        self.update_timer = QTimer(self)
+        self.update_timer.timeout.connect(self.refresh)
 
         self.init_ui()
 
-    def start_update_threads(self):
-        self.get_label_thread = LabelThread(self.current_targets, self.current_activity)
-        self.connect(self.get_label_thread, SIGNAL("set_control_data(QString)"), self.set_control_data)
-        self.get_label_thread.start()
-
-        self.get_bars_thread = BarsThread(self.current_targets, self.current_activity)
-        self.connect(self.get_bars_thread, SIGNAL("set_bar_values(QString)"), self.set_bar_values)
-        self.get_bars_thread.start()
-
-    @staticmethod
-    def percentage(part, whole):
-        return 100 * float(part)/float(whole)
-
-    def derive_activity(self, _values, _label):
-        last_x  = self.last_values[_label][0]
-        last_y  = self.last_values[_label][1]
-        now_x   = _values[0]
-        now_y   = _values[1]
-        delta_x = abs(last_x - now_x)
-        delta_y = abs(last_y - now_y)
-        self.last_values[_label] = _values
-        return delta_x+delta_y
-
-    def set_bar_values(self, _values):
-            for label in self.info_labels:
-                if label in self.current_targets.keys() and label in self.current_activity.keys():
-                    try:
-                        percent = self.derive_activity(self.current_targets[label], label)
-                        self.current_activity[label].setValue(percent)
-                        self.current_activity[label].setFormat(str(percent)+"%  Activity (@ 2 Hz) ")
-                    except Exception, e:
-                        pass
-
-    def set_control_data(self, _values):
-            if self.arbitration.winner is not None:
-                self.ccs_label.setText("Current Control Input << "+self.input_sources[self.arbitration.winner].inscope)
-                self.loop_label.setText("SRG Main Loop @ " + str(self.arbitration.loop_speed) + " Hz")
-                for gc in self.gaze_controller:
-                    try:
-                        self.loop_labels[gc.mw.inscope].setText("'Set Gaze' Loop for: " + gc.mw.inscope + " @ " + str(gc.loop_speed) + " Hz")
-                        self.current_targets[gc.mw.inscope] = [ int(gc.mw.current_robot_gaze.pan), int(gc.mw.current_robot_gaze.tilt) ]
-                    except Exception, e:
-                        pass
-                for name in self.current_targets.keys():
-                    try:
-                        self.info_labels[name].setText("Calculated Gaze Targets for: " + name + " " + str(self.current_targets[name]) + " @ Degrees " )
-                    except Exception, e:
-                        pass
-                if self.arbitration.is_override:
-                    self.override_button.setText("Override: " + self.arbitration.override_type)
-                    self.override_button.setChecked(True)
-                else:
-                    self.override_button.setChecked(False)
-                    self.override_button.setText("Override: Negative!")
+    def start_updates(self):
+        self.arbitration.state_wanted = True
+        self.update_timer.start(int(1000.0 / self.refresh_rate))
+
+    def stop_updates(self):
+        self.update_timer.stop()
+        self.arbitration.state_wanted = False
+
+    def set_refresh_rate(self, _rate):
+        self.refresh_rate = _rate
+        if self.update_timer.isActive():
+            self.update_timer.start(int(1000.0 / self.refresh_rate))
+
+    def refresh(self):
+        version, state = self.arbitration.get_state()
+        if version == self.drawn_version or state is None:
+            return
+        self.drawn_version = version
+        self.redraw(state)
+
+    def changed(self, _key, _value):
+        if _key in self.drawn and self.drawn[_key] == _value:
+            return False
+        self.drawn[_key] = _value
+        return True
+
+    def redraw(self, _state):
+        # Throttled by the Arbitration's LatencyWatchdog under load
+        if self.changed("gui_rate", _state["gui_rate"]):
+            self.set_refresh_rate(_state["gui_rate"] or self.full_refresh_rate)
+        if _state["winner"] is not None and self.changed("winner", _state["winner"]):
+            self.ccs_label.setText("Current Control Input << " + _state["winner"])
+        if self.changed("loop_speed", _state["loop_speed"]):
+            self.loop_label.setText("SRG Main Loop @ " + str(_state["loop_speed"]) + " Hz")
+        if self.changed("override", (_state["is_override"], _state["override_type"])):
+            if _state["is_override"]:
+                self.override_button.setText("Override: " + str(_state["override_type"]))
+                self.override_button.setChecked(True)
+            else:
+                self.override_button.setChecked(False)
+                self.override_button.setText("Override: Negative!")
+        for name, source in _state["sources"].items():
+            if name not in self.info_labels:
+                continue
+            if self.changed((name, "loop_speed"), source["loop_speed"]):
+                self.loop_labels[name].setText("'Set Gaze' Loop for: " + name + " @ " + str(source["loop_speed"]) + " Hz")
+            if source["target"] is not None and self.changed((name, "target"), source["target"]):
+                self.info_labels[name].setText("Calculated Gaze Targets for: " + name + " " + str(list(source["target"])) + " @ Degrees ")
+            if self.changed((name, "timeouts"), source["timeouts"]):
+                stimulus, boring, learned = source["timeouts"]
+                self.timeout_labels[name].setText("Timeouts (%s): Stimulus %.2f s Boring %.2f s" %
+                                                  ("learned" if learned else "static", stimulus, boring))
+            if self.changed((name, "activity"), source["activity"]):
+                bar = self.current_activity[name]
+                percent = min(source["activity"], bar.maximum())
+                bar.setValue(percent)
+                bar.setFormat(str(percent)+"%  Activity ")
 
     def pause(self):
             if self.is_paused is False:
@@ -254,4 +216,4 @@ class Viz(QtGui.QWidget):
 
     def init_ui(self):
         self.setGeometry(100, 100, 640, 200)
-        self.setWindowTitle(":: Florian's Simple Robot Gaze :: [GUI Update Rate 25 Hz]")
+        self.setWindowTitle(":: Florian's Simple Robot Gaze :: [GUI Update Rate <= %d Hz]" % self.refresh_rate)
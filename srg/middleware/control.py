@@ -0,0 +1,74 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# SELF IMPORTS
+from srg.utils import lifecycle as lc
+
+
+class ControlConnector(lc.StoppableThread):
+    """
+    Base class of the control channels. A message is a command name with
+    optional arguments separated by blanks, e.g., "force /faces". Registered
+    commands get the arguments as strings, "pause" pauses the arbitration and
+    "resume" resumes it. Unknown messages leave the arbitration as it is.
+    """
+    def __init__(self, _inscope):
+        lc.StoppableThread.__init__(self)
+        self.ready = False
+        self.pause_auto_arbitrate = False
+        self.inscope = _inscope
+        self.name = "control %s" % self.inscope
+        self.commands = {}
+
+    def add_command(self, _name, _callback):
+        """
+        Registers a callback for a command name, e.g., "dump"
+        """
+        self.commands.setdefault(_name.lower(), []).append(_callback)
+
+    def handle(self, _data):
+        words = _data.lower().strip().split()
+        command = words[0] if words else ""
+        if command in self.commands:
+            for callback in self.commands[command]:
+                try:
+                    callback(*words[1:])
+                except (TypeError, ValueError), e:
+                    print ">>> Command '%s' failed: %s" % (" ".join(words), str(e))
+        elif command == "pause":
+            self.pause_auto_arbitrate = True
+            print ">>> Auto Arbitrate is PAUSED"
+        elif command == "resume":
+            self.pause_auto_arbitrate = False
+            print ">>> Auto Arbitrate is RESUMED"
+        else:
+            print ">>> Unknown command '%s'" % _data.strip()
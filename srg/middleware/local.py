@@ -0,0 +1,128 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import time
+import random
+
+# SELF IMPORTS
+from srg.middleware import stimulus as st
+from srg.middleware import control as ctl
+
+
+class LocalConnector(st.StimulusSource):
+    """
+    In-process stand-in for a middleware source. Stimuli are fed by
+    calling feed_people / feed_point, e.g., from benchmarks or a
+    scripted test, no middleware is involved.
+    """
+    def __init__(self, _inscope, _datatype):
+        st.StimulusSource.__init__(self, _inscope, _datatype)
+
+    def feed_people(self, _stamp, _positions):
+        """
+        :param _stamp header stamp in seconds
+        :param _positions list of (x, y, z) or (x, y, z, name) in pixels
+        """
+        arrival = time.time()
+        if self.shed(arrival):
+            return
+        nearest = self.select(_positions)
+        if nearest is None:
+            self.dropped.inc()
+            return
+        self.publish(_stamp, nearest[0], nearest[1], nearest[2], arrival)
+
+    def feed_point(self, _stamp, _x, _y, _z):
+        arrival = time.time()
+        if self.shed(arrival):
+            return
+        self.publish(_stamp, _x, _y, _z, arrival)
+
+    def run(self):
+        print ">>> Initializing Local Source: %s" % self.inscope
+        self.ready = True
+        self.wait()
+        print ">>> Deactivating Local Source: %s" % self.inscope
+
+
+class SyntheticConnector(LocalConnector):
+    """
+    Generates People messages on its own at "rate" Hz. "work" loop iterations
+    per message emulate an expensive detector or tracker, so it can stand in
+    for heavy sources in benchmarks.
+    """
+    def __init__(self, _inscope, _datatype, rate=30.0, work=0, people=5, width=320.0, height=240.0):
+        LocalConnector.__init__(self, _inscope, _datatype)
+        self.period    = 1.0 / float(rate)
+        self.work      = int(work)
+        self.people    = int(people)
+        self.width     = float(width)
+        self.height    = float(height)
+        self.generated = 0
+
+    def burn(self):
+        x = 0
+        for n in xrange(self.work):
+            x += n * n
+        return x
+
+    def run(self):
+        print ">>> Initializing Synthetic Source: %s" % self.inscope
+        self.ready = True
+        while self.run_toggle is True:
+            then = time.time()
+            positions = [(random.uniform(0, self.width), random.uniform(0, self.height), random.uniform(10, 80))
+                         for n in xrange(self.people)]
+            self.burn()
+            self.feed_people(then, positions)
+            self.generated += 1
+            rest = self.period - (time.time() - then)
+            if rest > 0:
+                self.wait(rest)
+        print ">>> Deactivating Synthetic Source: %s" % self.inscope
+
+
+class LocalControlConnector(ctl.ControlConnector):
+    """
+    In-process stand-in for the RosControlConnector, call send() with
+    the same strings you would publish on the toggle topic.
+    """
+    def __init__(self):
+        ctl.ControlConnector.__init__(self, "local:toggle")
+
+    def send(self, _data):
+        self.handle(_data)
+
+    def run(self):
+        self.ready = True
+        self.wait()
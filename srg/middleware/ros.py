@@ -31,9 +31,8 @@ Authors: Florian Lier, Simon Schulz
 """
 
 # STD IMPORTS
+import math
 import time
-import operator
-import threading
 
 # ROS IMPORTS
 import rospy
@@ -43,10 +42,12 @@ from std_msgs.msg import String
 from people_msgs.msg import Person
 from people_msgs.msg import People
 from geometry_msgs.msg import PointStamped
+from sensor_msgs.msg import JointState
 
-# HLRC IMPORTS
-from hlrc_client import RobotGaze
-from hlrc_client import RobotTimestamp
+# SELF IMPORTS
+from srg.middleware import stimulus as st
+from srg.middleware import control as ctl
+from srg.utils import lifecycle as lc
 
 
 class ToggleConnector:
@@ -63,120 +64,49 @@ class ToggleConnector:
         self.pub.publish(r)
 
 
-class RosControlConnector(threading.Thread):
+class RosControlConnector(ctl.ControlConnector):
     def __init__(self):
-        threading.Thread.__init__(self)
-        self.run_toggle = True
-        self.ready = False
-        self.pause_auto_arbitrate = False
-        self.inscope = "/robotgazetools/toggle"
+        ctl.ControlConnector.__init__(self, "/robotgazetools/toggle")
 
     def control_callback(self, ros_data):
-        if ros_data.data.lower() == "pause":
-            self.pause_auto_arbitrate = True
-            print ">>> Auto Arbitrate is PAUSED"
-        else:
-            self.pause_auto_arbitrate = False
-            print ">>> Auto Arbitrate is RESUMED"
+        self.handle(ros_data.data)
 
     def run(self):
         print ">>> Initializing ROS Toggle Subscriber to: %s" % self.inscope.strip()
         toggle_subscriber = rospy.Subscriber(self.inscope, String, self.control_callback, queue_size=1)
         self.ready = True
-        while self.run_toggle is True:
-            time.sleep(0.05)
+        self.wait()
         toggle_subscriber.unregister()
         print ">>> Deactivating ROS Toggle Subscriber to: %s" % self.inscope.strip()
 
 
-class RosConnector(threading.Thread):
+class RosConnector(st.StimulusSource):
     """
-    The GazeController receives person messages (ROS) and derives
-    the nearest person identified. Based on this, the robot's
-    joint angle target's are derived using the transformation
-    class below
+    The RosConnector receives person or point messages (ROS) and derives
+    the nearest person identified. The selected stimulus is handed to the
+    views of all robots, which derive their joint angle targets using
+    their own transformation
     """
-    def __init__(self, _inscope, _transform, _datatype, _mode, _stimulus_timeout, _lock):
-        threading.Thread.__init__(self)
-        self.lock     = _lock
-        self.run_toggle      = True
-        self.ready    = False
-        self.trans    = _transform
-        self.inscope  = str(_inscope).lower().strip()
-        self.datatype = str(_datatype).lower().strip()
-        self.mode     = str(_mode).lower().strip()
-        self.stimulus_timeout = float(_stimulus_timeout)
-        self.nearest_person_x = 0.0
-        self.nearest_person_y = 0.0
-        self.nearest_person_z = 0.0
-        self.roi_x            = 0.0
-        self.roi_y            = 0.0
-        self.point_x          = 0.0
-        self.point_y          = 0.0
-        self.point_z          = 0.0
-        self.current_robot_gaze = None
-        self.current_robot_gaze_timestamp = None
+    def __init__(self, _inscope, _datatype):
+        st.StimulusSource.__init__(self, _inscope, _datatype)
 
     def people_callback(self, ros_data):
-        self.lock.acquire()
-        send_time = ros_data.header.stamp
-        idx = -1
-        max_distance = {}
-        for person in ros_data.people:
-            idx += 1
-            max_distance[str(idx)] = person.position.z
-        # print ">> Persons found {idx, distance}: ", max_distance
-        sort = sorted(max_distance.items(), key=operator.itemgetter(1), reverse=True)
-        # print ">> Nearest Face: ", sort
-        # print ">> Index: ", sort[0][0]
-        # print ">> Distance in pixels: ", sort[0][1]
-        self.nearest_person_x = ros_data.people[int(sort[0][0])].position.x
-        self.nearest_person_y = ros_data.people[int(sort[0][0])].position.y
-        self.nearest_person_z = ros_data.people[int(sort[0][0])].position.z
-        # print ">> Position in pixels x:", self.nearest_person_x
-        # print ">> Position in pixels y:", self.nearest_person_y
-        point = [self.nearest_person_x, self.nearest_person_y]
-        # Derive coordinate mapping
-        angles = self.trans.derive_mapping_coords(point)
-        if angles is not None:
-            g = RobotGaze()
-            if self.mode == 'relative':
-                g.gaze_type = RobotGaze.GAZETARGET_RELATIVE
-            else:
-                g.gaze_type = RobotGaze.GAZETARGET_ABSOLUTE
-            self.current_robot_gaze_timestamp = send_time.to_sec()
-            g.gaze_timestamp = RobotTimestamp(self.current_robot_gaze_timestamp)
-            g.pan = angles[0]
-            g.tilt = angles[1]
-            self.current_robot_gaze = g
-        self.lock.release()
-        self.honor_stimulus_timeout()
+        arrival = time.time()
+        if self.shed(arrival):
+            return
+        positions = [(p.position.x, p.position.y, p.position.z, p.name) for p in ros_data.people]
+        nearest = self.select(positions)
+        if nearest is None:
+            self.dropped.inc()
+            return
+        self.publish(ros_data.header.stamp.to_sec(), nearest[0], nearest[1], nearest[2], arrival)
 
     def point_callback(self, ros_data):
-        self.lock.acquire()
-        send_time = ros_data.header.stamp
-        self.point_x = ros_data.point.x
-        self.point_y = ros_data.point.y
-        self.point_z = ros_data.point.z
-        point = [self.point_x, self.point_y]
-        # Derive coordinate mapping
-        angles = self.trans.derive_mapping_coords(point)
-        if angles is not None:
-            g = RobotGaze()
-            if self.mode == 'absolute':
-                g.gaze_type = RobotGaze.GAZETARGET_ABSOLUTE
-            else:
-                g.gaze_type = RobotGaze.GAZETARGET_RELATIVE
-            self.current_robot_gaze_timestamp = send_time.to_sec()
-            g.gaze_timestamp = RobotTimestamp(self.current_robot_gaze_timestamp)
-            g.pan = angles[0]
-            g.tilt = angles[1]
-            self.current_robot_gaze = g
-        self.lock.release()
-        self.honor_stimulus_timeout()
-
-    def honor_stimulus_timeout(self):
-        time.sleep(self.stimulus_timeout)
+        arrival = time.time()
+        if self.shed(arrival):
+            return
+        point = ros_data.point
+        self.publish(ros_data.header.stamp.to_sec(), point.x, point.y, point.z, arrival)
 
     def run(self):
         print ">>> Initializing ROS Subscriber to: %s" % self.inscope.strip()
@@ -192,7 +122,45 @@ class RosConnector(threading.Thread):
             print ">>> ERROR %s" % str(e)
             return
         self.ready = True
-        while self.run_toggle is True:
-            time.sleep(0.05)
+        self.wait()
         person_subscriber.unregister()
         print ">>> Deactivating ROS Subscriber to: %s" % self.inscope.strip()
+
+
+class RosJointStateFeed(lc.StoppableThread):
+    """
+    Fills a JointStateHistory from the robot's sensor_msgs/JointState feed
+    """
+    def __init__(self, _inscope, _history, _pan_joint, _tilt_joint, _unit="rad"):
+        lc.StoppableThread.__init__(self)
+        self.ready      = False
+        self.inscope    = str(_inscope).strip()
+        self.name       = "joint states %s" % self.inscope
+        self.history    = _history
+        self.pan_joint  = _pan_joint
+        self.tilt_joint = _tilt_joint
+        self.scale      = 180.0 / math.pi if str(_unit).lower() == "rad" else 1.0
+        self.names      = None
+        self.indices    = None
+
+    def joint_callback(self, ros_data):
+        # Joint order is usually fixed, only look it up when it changes
+        if ros_data.name != self.names:
+            try:
+                self.indices = (ros_data.name.index(self.pan_joint), ros_data.name.index(self.tilt_joint))
+            except ValueError:
+                self.indices = None
+            self.names = ros_data.name
+        if self.indices is None:
+            return
+        self.history.add(ros_data.header.stamp.to_sec(),
+                         ros_data.position[self.indices[0]] * self.scale,
+                         ros_data.position[self.indices[1]] * self.scale)
+
+    def run(self):
+        print ">>> Initializing ROS Joint State Subscriber to: %s" % self.inscope
+        joint_subscriber = rospy.Subscriber(self.inscope, JointState, self.joint_callback, queue_size=10)
+        self.ready = True
+        self.wait()
+        joint_subscriber.unregister()
+        print ">>> Deactivating ROS Joint State Subscriber to: %s" % self.inscope
@@ -0,0 +1,388 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import time
+import threading
+
+# HLRC IMPORTS
+from hlrc_client import RobotGaze
+from hlrc_client import RobotTimestamp
+
+# SELF IMPORTS
+from srg.utils import ringbuffer as rb
+from srg.utils import metrics as m
+from srg.utils import tracing as tr
+from srg.utils import rate as ra
+from srg.utils import lifecycle as lc
+from srg.utils import clock as ck
+
+
+# Middlewares a SourceHub can create sources for
+MIDDLEWARES = ("ros", "local", "synthetic")
+
+
+def normalize(_inscope):
+    """
+    Sources are identified by their lower case inscope
+    """
+    return str(_inscope).lower().strip()
+
+
+class StimulusSource(lc.StoppableThread):
+    """
+    Base class of all input sources. A source decodes its middleware
+    messages and selects one stimulus (x, y, z in pixels) per message,
+    exactly once. Every robot attached through a StimulusView maps that
+    stimulus with its own transform.
+    """
+    def __init__(self, _inscope, _datatype):
+        lc.StoppableThread.__init__(self)
+        self.ready      = False
+        self.inscope    = normalize(_inscope)
+        self.datatype   = str(_datatype).lower().strip()
+        self.name       = "connector %s" % self.inscope
+        self.views      = []
+        # Optional SourceLiveness and AttentionScheduler, set up by the Arbitration
+        self.liveness   = None
+        self.scheduler  = None
+        self.arrivals   = ra.InterArrivalEstimator()
+        self.clock      = ck.ClockOffsetEstimator(self.inscope)
+        self.skipped    = 0
+        self.callback_time = m.REGISTRY.histogram("srg_callback_seconds", "Processing time of input callbacks",
+                                                  {"source": self.inscope})
+        self.dropped = m.REGISTRY.counter("srg_dropped_messages_total", "Input messages without a usable stimulus",
+                                          {"source": self.inscope})
+
+    def add_view(self, _view):
+        # Copy on write, publish iterates the list without locking
+        self.views = self.views + [_view]
+
+    def remove_view(self, _view):
+        self.views = [view for view in self.views if view is not _view]
+
+    def request_stop(self):
+        lc.StoppableThread.request_stop(self)
+        if self.scheduler is not None:
+            self.scheduler.stop()
+
+    def shed(self, _arrival):
+        """
+        Load shedding before the stimulus is selected: a message is skipped
+        if every view decimates it (see StimulusView.decimation). Its arrival
+        still counts for liveness and rates.
+        :param _arrival local wall clock time the message was received
+        :return True if the message is to be dropped
+        """
+        # Views that do not decimate, e.g., of benchmarks, need no attribute
+        decimation = min([getattr(view, "decimation", 1) for view in self.views] or [1])
+        if decimation <= 1:
+            return False
+        self.skipped += 1
+        if self.skipped < decimation:
+            self.arrive(ck.to_monotonic(_arrival))
+            return True
+        self.skipped = 0
+        return False
+
+    def arrive(self, _mono):
+        # Liveness judges the message against the deadline before it
+        if self.liveness is not None:
+            self.liveness.arrival(_mono)
+        self.arrivals.update(_mono)
+
+    def select(self, _positions):
+        """
+        :param _positions list of (x, y, z) or (x, y, z, name) of the people in view
+        :return the person scheduled by the AttentionScheduler or, without one, the nearest
+        """
+        scheduler = self.scheduler
+        if scheduler is None:
+            return self.select_nearest(_positions)
+        return scheduler.select(_positions)
+
+    @staticmethod
+    def select_nearest(_positions):
+        """
+        :param _positions list of (x, y, z), z is the size of the person in pixels
+        :return the largest, i.e., nearest, position or None
+        """
+        nearest = None
+        for position in _positions:
+            if nearest is None or position[2] > nearest[2]:
+                nearest = position
+        return nearest
+
+    def publish(self, _stamp, _x, _y, _z, _arrival):
+        """
+        Hands a selected stimulus to all views. Rates, deadlines and ages
+        are kept on the monotonic clock, the stamp only yields the delay.
+        :param _stamp header stamp in seconds
+        :param _arrival local wall clock time the message was received
+        """
+        mono = ck.to_monotonic(_arrival)
+        delay = self.clock.update(_stamp, _arrival, mono)
+        self.arrive(mono)
+        for view in self.views:
+            view.update(_stamp, _x, _y, _z, _arrival, mono, delay)
+        done = time.time()
+        self.callback_time.observe(done - _arrival)
+        if tr.TRACER.enabled:
+            tr.TRACER.span("transport", _stamp, _arrival, _stamp)
+            tr.TRACER.span("%s_callback" % self.datatype, _arrival, done, _stamp)
+
+
+
+class StimulusView:
+    """
+    One robot's view of a shared StimulusSource. Holds the latest mapped
+    RobotGaze and everything the Arbitration and GazeController read.
+    """
+    def __init__(self, _source, _transform, _mode, _stimulus_timeout, _lock):
+        self.source   = _source
+        self.lock     = _lock
+        self.trans    = _transform
+        self.inscope  = _source.inscope
+        self.datatype = _source.datatype
+        self.stimulus_timeout = float(_stimulus_timeout)
+        # Only every n-th message is processed, set by the LatencyWatchdog and
+        # applied by the source before the selection, see StimulusSource.shed
+        self.decimation       = 1
+        # Effective values, maintained by the Arbitration's AdaptiveTimeouts
+        self.boring_timeout   = None
+        self.timeouts         = None
+        self.nearest_person_x = 0.0
+        self.nearest_person_y = 0.0
+        self.nearest_person_z = 0.0
+        self.point_x          = 0.0
+        self.point_y          = 0.0
+        self.point_z          = 0.0
+        self.current_robot_gaze = None
+        self.current_robot_gaze_timestamp = None
+        self.current_robot_gaze_arrival = None
+        # Monotonic arrival and estimated transport delay, see age()
+        self.current_robot_gaze_mono = None
+        self.current_robot_gaze_delay = 0.0
+        # Recent stimuli (capture time, stamp, mono, delay, z), kept if an ApproximateTimeSynchronizer is attached
+        self.recent = None
+        self.last_accepted = None
+        self.history = rb.SourceHistory()
+        # Set by the Arbitration if the robot's joint states are available
+        self.joint_history = None
+        # Startup readiness, an optional source may be missing, None waits the default time
+        self.optional      = False
+        self.ready_timeout = None
+        self.set_mode(_mode)
+        _source.add_view(self)
+
+    @property
+    def ready(self):
+        return self.source.ready
+
+    def set_mode(self, _mode):
+        self.mode = str(_mode).lower().strip()
+        if self.mode == 'relative' or (self.mode != 'absolute' and self.datatype == 'pointstamped'):
+            self.gaze_type = RobotGaze.GAZETARGET_RELATIVE
+        else:
+            self.gaze_type = RobotGaze.GAZETARGET_ABSOLUTE
+
+    def age(self, _now):
+        """
+        Age of the current stimulus, not affected by clock skew or wall clock jumps
+        :param _now monotonic clock
+        """
+        return _now - self.current_robot_gaze_mono + self.current_robot_gaze_delay
+
+    def update(self, _stamp, _x, _y, _z, _arrival, _mono, _delay):
+        # Skip stimuli for stimulus_timeout seconds after an accepted one
+        if self.last_accepted is not None and _mono - self.last_accepted < self.stimulus_timeout:
+            return
+        lock_start = time.time()
+        self.lock.acquire()
+        if tr.TRACER.enabled:
+            tr.TRACER.span("lock_wait", lock_start, time.time(), _stamp)
+        if self.datatype == "people":
+            self.nearest_person_x = _x
+            self.nearest_person_y = _y
+            self.nearest_person_z = _z
+        else:
+            self.point_x = _x
+            self.point_y = _y
+            self.point_z = _z
+        # Derive coordinate mapping
+        angles = self.trans.derive_mapping_coords([_x, _y])
+        if angles is not None and self.joint_history is not None and self.gaze_type == RobotGaze.GAZETARGET_RELATIVE:
+            angles = self.compensate_ego_motion(_arrival - _delay, angles)
+        if angles is not None:
+            g = RobotGaze()
+            g.gaze_type = self.gaze_type
+            self.current_robot_gaze_timestamp = _stamp
+            g.gaze_timestamp = RobotTimestamp(_stamp)
+            g.pan = angles[0]
+            g.tilt = angles[1]
+            self.current_robot_gaze = g
+            self.current_robot_gaze_arrival = _arrival
+            self.current_robot_gaze_mono = _mono
+            self.current_robot_gaze_delay = _delay
+            self.last_accepted = _mono
+            if self.recent is not None:
+                self.recent.append((_mono - _delay, _stamp, _mono, _delay, _z))
+            self.history.add_stimulus(_arrival, g.pan, g.tilt)
+        else:
+            self.source.dropped.inc()
+        self.lock.release()
+
+
+    def compensate_ego_motion(self, _captured, _angles):
+        """
+        A relative target is relative to the head pose at capture time, the
+        robot applies it relative to the current pose. Adds the head motion
+        since the frame was taken, so moving heads do not overshoot.
+        :param _captured capture time on the local clock, the arrival minus the skew corrected delay
+        """
+        then = self.joint_history.interpolate(_captured)
+        now = self.joint_history.latest()
+        if then is None or now is None:
+            return _angles
+        return [_angles[0] + then[0] - now[0], _angles[1] + then[1] - now[1]]
+
+
+class SourceHub:
+    """
+    Shared input sources of one process, keyed by inscope. Several
+    Arbitrations (robots) can attach views to the same source, the
+    messages are then received and decoded only once. A source that is
+    replaced while other robots still have views on it is retired: it keeps
+    running for them and is stopped when its last view is released.
+    """
+    def __init__(self):
+        self.lock    = threading.Lock()
+        self.sources = {}
+        self.kinds   = {}
+        self.started = set()
+        self.retired = []
+
+    def source(self, _inscope, _middleware, _datatype, _options=None, _worker=False):
+        """
+        :param _options dict of source specific options, e.g., for synthetic sources
+        :param _worker run the source in a separate worker process
+        :return the existing source for _inscope or a new one, an existing source
+                of another middleware, datatype, options or worker setting is replaced
+        """
+        inscope = normalize(_inscope)
+        kind = (_middleware.lower(), str(_datatype).lower().strip(), _options, bool(_worker))
+        self.lock.acquire()
+        try:
+            if inscope in self.sources and self.kinds[inscope] == kind:
+                return self.sources[inscope]
+            # Create first, a source that cannot be created does not stop the running one
+            if _worker:
+                from srg.middleware import worker as w
+                self.check(_middleware.lower())
+                source = w.WorkerSource(inscope, _middleware.lower(), _datatype, _options)
+            else:
+                source = self.create(inscope, _middleware.lower(), _datatype, _options)
+            if inscope in self.sources:
+                old = self.sources.pop(inscope)
+                self.started.discard(inscope)
+                if old.views:
+                    self.retired.append(old)
+                else:
+                    old.request_stop()
+            self.kinds[inscope] = kind
+            self.sources[inscope] = source
+            return source
+        finally:
+            self.lock.release()
+
+    @staticmethod
+    def check(_middleware):
+        """
+        Raises ValueError for a middleware create() does not support
+        """
+        if _middleware == "rsb":
+            raise ValueError("RSB is currrenly not supported :|")
+        if _middleware not in MIDDLEWARES:
+            raise ValueError("Unknown middleware %s" % _middleware)
+
+    @staticmethod
+    def create(_inscope, _middleware, _datatype, _options=None):
+        SourceHub.check(_middleware)
+        if _middleware == "ros":
+            from srg.middleware import ros as r
+            return r.RosConnector(_inscope, _datatype)
+        elif _middleware == "local":
+            from srg.middleware import local as l
+            return l.LocalConnector(_inscope, _datatype)
+        elif _middleware == "synthetic":
+            from srg.middleware import local as l
+            return l.SyntheticConnector(_inscope, _datatype, **(_options or {}))
+
+    def start(self):
+        """
+        Starts all sources that are not running yet, may be called once per robot.
+        """
+        self.lock.acquire()
+        for inscope, source in self.sources.items():
+            if inscope not in self.started:
+                self.started.add(inscope)
+                source.start()
+        self.lock.release()
+
+    def release(self, _source):
+        """
+        Stops _source if no view is attached anymore
+        """
+        self.lock.acquire()
+        try:
+            if _source.views:
+                return
+            if self.sources.get(_source.inscope) is _source:
+                del self.sources[_source.inscope]
+                self.started.discard(_source.inscope)
+            elif _source in self.retired:
+                self.retired.remove(_source)
+            else:
+                return
+            _source.request_stop()
+        finally:
+            self.lock.release()
+
+    def running(self):
+        """
+        :return all sources of the hub, retired ones included
+        """
+        return self.sources.values() + self.retired
+
+    def request_stop(self):
+        for source in self.running():
+            source.request_stop()
@@ -0,0 +1,146 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import sys
+import json
+import time
+import struct
+import threading
+import subprocess
+
+# SELF IMPORTS
+from srg.middleware import stimulus as st
+
+
+# kind ('R'eady, 'S'timulus, 'D'ropped), stamp, x, y, z, arrival
+RECORD = struct.Struct("<cddddd")
+
+
+class WorkerSource(st.StimulusSource):
+    """
+    Runs an input source in a separate Python process, so heavy sources do
+    not compete for the GIL of the arbitration process. The worker sends
+    one fixed size record per selected stimulus through a pipe, this
+    thread hands them to the views like any other source.
+    """
+    def __init__(self, _inscope, _middleware, _datatype, _options=None):
+        st.StimulusSource.__init__(self, _inscope, _datatype)
+        self.name       = "worker %s" % self.inscope
+        self.middleware = _middleware
+        self.options    = _options or {}
+        self.proc       = None
+
+    def run(self):
+        print ">>> Initializing Worker Process for: %s" % self.inscope
+        self.proc = subprocess.Popen([sys.executable, "-m", "srg.middleware.worker",
+                                      self.inscope, self.middleware, self.datatype, json.dumps(self.options)],
+                                     stdin=subprocess.PIPE, stdout=subprocess.PIPE, bufsize=0)
+        stream = self.proc.stdout
+        size = RECORD.size
+        while True:
+            data = stream.read(size)
+            if len(data) < size:
+                break
+            kind, stamp, x, y, z, arrival = RECORD.unpack(data)
+            if kind == 'S':
+                # The worker selected already, shedding spares the views only
+                if not self.shed(arrival):
+                    self.publish(stamp, x, y, z, arrival)
+            elif kind == 'D':
+                self.dropped.inc()
+            elif kind == 'R':
+                self.ready = True
+        self.proc.wait()
+        print ">>> Deactivating Worker Process for: %s" % self.inscope
+
+    def request_stop(self):
+        self.run_toggle = False
+        # The worker exits as soon as its stdin is closed
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.stdin.close()
+
+
+class PipeWriter:
+    """
+    Worker side: attached to the real source as its only view and as its
+    dropped counter, writes records to the parent process.
+    """
+    def __init__(self, _stream):
+        self.stream = _stream
+        self.lock   = threading.Lock()
+        self.source = None
+
+    @property
+    def ready(self):
+        return self.source.ready
+
+    def write(self, _kind, _stamp=0.0, _x=0.0, _y=0.0, _z=0.0, _arrival=0.0):
+        data = RECORD.pack(_kind, _stamp, _x, _y, _z, _arrival)
+        self.lock.acquire()
+        self.stream.write(data)
+        self.lock.release()
+
+    def update(self, _stamp, _x, _y, _z, _arrival, _mono, _delay):
+        # The parent derives the monotonic arrival and the delay from _arrival again
+        self.write('S', _stamp, _x, _y, _z, _arrival)
+
+    def inc(self, _amount=1):
+        for n in xrange(_amount):
+            self.write('D')
+
+
+def worker_main(_inscope, _middleware, _datatype, _options):
+    # Records go to the original stdout, prints end up on stderr
+    stream = os.fdopen(os.dup(1), "wb", 0)
+    os.dup2(2, 1)
+    if _middleware == "ros":
+        import rospy
+        rospy.init_node("srg_worker", anonymous=True, disable_signals=True)
+    writer = PipeWriter(stream)
+    source = st.SourceHub.create(_inscope, _middleware, _datatype, _options)
+    source.dropped = writer
+    writer.source = source
+    source.add_view(writer)
+    source.start()
+    while not source.ready and source.is_alive():
+        time.sleep(0.005)
+    writer.write('R')
+    # Block until the parent closes our stdin
+    sys.stdin.read()
+    source.request_stop()
+    source.join()
+
+
+if __name__ == '__main__':
+    worker_main(sys.argv[1], sys.argv[2], sys.argv[3], json.loads(sys.argv[4]))
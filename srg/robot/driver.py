@@ -31,19 +31,85 @@ Authors: Florian Lier, Simon Schulz
 """
 
 # STD IMPORTS
+import time
 import logging
+import threading
 
 # HLRC
 from hlrc_client import RobotController
 
 
+class LocalRobotController:
+    """
+    In-process stand-in for the HLRC RobotController, selected with
+    a local://name outscope. Counts and keeps the last gaze target.
+    """
+    def __init__(self, _name):
+        self.name        = _name
+        self.lock        = threading.Lock()
+        self.count       = 0
+        self.last_target = None
+        self.last_time   = None
+
+    def set_gaze_target(self, _gaze, _blocking=True):
+        self.lock.acquire()
+        self.count += 1
+        self.last_target = _gaze
+        self.last_time = time.time()
+        self.lock.release()
+
+
 class RobotDriver:
     """
     This class holds the robot controller.
     Provides better encapsulation though...
+    The outscope selects the backend: local://name for the in-process
+    stand-in, udp://host:port for binary datagrams to a low level head
+    controller, sim://name for a simulated head, anything else is an HLRC
+    scope.
     """
     def __init__(self, _mw, _outscope):
         print(">>> Initializing Robot Controller")
         self.mw               = _mw
         self.outscope         = _outscope.strip()
-        self.robot_controller = RobotController(self.mw, self.outscope, logging.INFO)
\ No newline at end of file
+        # Backends with their own thread, stopped with the driver
+        self.thread           = None
+        if self.outscope.startswith("local://"):
+            self.robot_controller = LocalRobotController(self.outscope[len("local://"):])
+        elif self.outscope.startswith("udp://"):
+            from srg.robot import udp as u
+            host, port, sequence = u.parse_outscope(self.outscope)
+            self.robot_controller = u.UdpRobotController(host, port, sequence)
+        elif self.outscope.startswith("sim://"):
+            from srg.robot import sim as s
+            name, options = s.parse_outscope(self.outscope)
+            self.robot_controller = s.SimulatedHead(name, options)
+            self.thread = self.robot_controller
+            self.thread.start()
+        else:
+            self.robot_controller = RobotController(self.mw, self.outscope, logging.INFO)
+        self.listeners        = []
+        self.last_sent        = (float("nan"), float("nan"))
+        self.first_sent       = None
+
+    def add_listener(self, _callback):
+        """
+        :param _callback called with every RobotGaze sent to the robot
+        """
+        self.listeners.append(_callback)
+
+    def request_stop(self):
+        if self.thread is not None:
+            self.thread.request_stop()
+        # Backends holding a socket, e.g., UDP
+        close = getattr(self.robot_controller, "close", None)
+        if close is not None:
+            close()
+
+    def set_gaze_target(self, _gaze, _blocking=True):
+        self.robot_controller.set_gaze_target(_gaze, _blocking)
+        self.last_sent = (_gaze.pan, _gaze.tilt)
+        if self.first_sent is None:
+            self.first_sent = time.time()
+        for callback in self.listeners:
+            callback(_gaze)
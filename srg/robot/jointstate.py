@@ -0,0 +1,135 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import math
+import time
+
+# HLRC IMPORTS
+from hlrc_client import RobotGaze
+
+# SELF IMPORTS
+from srg.utils import ringbuffer as rb
+from srg.utils import lifecycle as lc
+
+
+class JointStateHistory:
+    """
+    Recent head poses (pan, tilt in degrees) with their timestamps, used
+    to look up where the head was pointing when a camera frame was taken.
+    Samples must be added in time order.
+    """
+    def __init__(self, _size=rb.DEFAULT_SIZE):
+        self.buffer = rb.RingBuffer(_size, 2)
+
+    def add(self, _stamp, _pan, _tilt):
+        self.buffer.push2(_stamp, _pan, _tilt)
+
+    def sample(self, _n):
+        """
+        :param _n logical index, 0 is the oldest sample
+        :return (stamp, pan, tilt)
+        """
+        b = self.buffer
+        i = (b.index - b.count + _n) % b.size
+        return b.stamps[i], b.values[i * 2], b.values[i * 2 + 1]
+
+    def latest(self):
+        if self.buffer.count == 0:
+            return None
+        stamp, pan, tilt = self.sample(self.buffer.count - 1)
+        return pan, tilt
+
+    def interpolate(self, _stamp):
+        """
+        Linear interpolation of the head pose at _stamp. Newer than the newest
+        sample yields the newest pose, older than the oldest sample yields None.
+        :return (pan, tilt) or None
+        """
+        count = self.buffer.count
+        if count == 0:
+            return None
+        first = self.sample(0)
+        if _stamp < first[0]:
+            return None
+        last = self.sample(count - 1)
+        if _stamp >= last[0]:
+            return last[1], last[2]
+        # Binary search for the last sample not newer than _stamp
+        lo, hi = 0, count - 1
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self.sample(mid)[0] <= _stamp:
+                lo = mid
+            else:
+                hi = mid
+        s0, pan0, tilt0 = self.sample(lo)
+        s1, pan1, tilt1 = self.sample(hi)
+        if s1 <= s0:
+            return pan1, tilt1
+        f = (_stamp - s0) / (s1 - s0)
+        return pan0 + f * (pan1 - pan0), tilt0 + f * (tilt1 - tilt0)
+
+
+class SimulatedJointStateFeed(lc.StoppableThread):
+    """
+    Stand-in for the robot's joint state feed. Listens to the commands sent
+    through a RobotDriver and lets the head pose follow them with a first
+    order lag, sampled at "rate" Hz into the history.
+    """
+    def __init__(self, _history, _rate=100.0, _time_constant=0.15):
+        lc.StoppableThread.__init__(self)
+        self.name          = "simulated joint states"
+        self.history       = _history
+        self.period        = 1.0 / float(_rate)
+        self.time_constant = float(_time_constant)
+        self.ready         = False
+        self.pose          = [0.0, 0.0]
+        self.target        = [0.0, 0.0]
+
+    def command(self, _gaze):
+        if _gaze.gaze_type == RobotGaze.GAZETARGET_RELATIVE:
+            self.target = [self.pose[0] + _gaze.pan, self.pose[1] + _gaze.tilt]
+        else:
+            self.target = [_gaze.pan, _gaze.tilt]
+
+    def run(self):
+        self.ready = True
+        last = time.time()
+        while not self.wait(self.period):
+            now = time.time()
+            f = 1.0 - math.exp(-(now - last) / self.time_constant)
+            last = now
+            target = self.target
+            self.pose = [self.pose[0] + f * (target[0] - self.pose[0]),
+                         self.pose[1] + f * (target[1] - self.pose[1])]
+            self.history.add(now, self.pose[0], self.pose[1])
@@ -0,0 +1,164 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import time
+import collections
+
+# HLRC IMPORTS
+from hlrc_client import RobotGaze
+
+# SELF IMPORTS
+from srg.robot import jointstate as j
+from srg.utils import metrics as m
+from srg.utils import lifecycle as lc
+
+
+# Option defaults, all can be given in the outscope, e.g., sim://flobi?delay=0.05&frequency=8
+DEFAULTS = {"rate":              200.0,   # simulation steps per second
+            "delay":             0.03,    # actuation delay in seconds
+            "frequency":         12.0,    # natural frequency of the joint servos in rad/s
+            "damping":           0.7,     # damping ratio of the joint servos
+            "pan_min":           -90.0,   # joint limits in degrees
+            "pan_max":           90.0,
+            "tilt_min":          -45.0,
+            "tilt_max":          45.0,
+            "pan_velocity":      200.0,   # deg/s
+            "tilt_velocity":     150.0,
+            "pan_acceleration":  1500.0,  # deg/s^2
+            "tilt_acceleration": 1000.0}
+
+
+def parse_outscope(_outscope):
+    """
+    :param _outscope sim://name?option=value&...
+    :return (name, options dict)
+    """
+    rest = _outscope[len("sim://"):]
+    options = dict(DEFAULTS)
+    if "?" in rest:
+        rest, query = rest.split("?", 1)
+        for item in query.split("&"):
+            key, value = item.split("=", 1)
+            if key not in DEFAULTS:
+                raise ValueError("Unknown simulated head option %s" % key)
+            options[key] = float(value)
+    return rest, options
+
+
+class SimulatedHead(lc.StoppableThread):
+    """
+    In-process robot head, selected with a sim://name outscope. Commands
+    take effect after the actuation delay, relative ones relative to the
+    pose at that time. Every joint is a second order servo (natural
+    frequency, damping) whose velocity and acceleration are limited and
+    which stops at its joint limits. The pose is published into a
+    JointStateHistory like the robot's joint state feed.
+    """
+    def __init__(self, _name, _options=None):
+        lc.StoppableThread.__init__(self)
+        options = dict(DEFAULTS)
+        options.update(_options or {})
+        self.name             = "simulated head %s" % _name
+        self.period           = 1.0 / options["rate"]
+        self.delay            = options["delay"]
+        self.kp               = options["frequency"] ** 2
+        self.kd               = 2.0 * options["damping"] * options["frequency"]
+        self.limits           = [(options["pan_min"], options["pan_max"]), (options["tilt_min"], options["tilt_max"])]
+        self.max_velocity     = [options["pan_velocity"], options["tilt_velocity"]]
+        self.max_acceleration = [options["pan_acceleration"], options["tilt_acceleration"]]
+        self.pending          = collections.deque()
+        self.pose             = [0.0, 0.0]
+        self.velocity         = [0.0, 0.0]
+        self.target           = [0.0, 0.0]
+        self.history          = j.JointStateHistory()
+        self.count            = 0
+        self.last_target      = None
+        self.last_time        = None
+        self.ready            = False
+        self.received         = m.REGISTRY.counter("srg_sim_commands_total", "Commands received by the simulated head",
+                                                   {"robot": _name})
+
+    def set_gaze_target(self, _gaze, _blocking=True):
+        now = time.time()
+        # deque appends are atomic, the simulation thread pops
+        self.pending.append((now + self.delay, _gaze.gaze_type, _gaze.pan, _gaze.tilt))
+        self.count += 1
+        self.last_target = _gaze
+        self.last_time = now
+        self.received.inc()
+
+    def actuate(self, _now):
+        while self.pending and self.pending[0][0] <= _now:
+            due, gaze_type, pan, tilt = self.pending.popleft()
+            if gaze_type == RobotGaze.GAZETARGET_RELATIVE:
+                self.target = [self.pose[0] + pan, self.pose[1] + tilt]
+            else:
+                self.target = [pan, tilt]
+
+    def step_axis(self, _axis, _dt):
+        amax = self.max_acceleration[_axis]
+        vmax = self.max_velocity[_axis]
+        lower, upper = self.limits[_axis]
+        target = max(lower, min(upper, self.target[_axis]))
+        acceleration = self.kp * (target - self.pose[_axis]) - self.kd * self.velocity[_axis]
+        acceleration = max(-amax, min(amax, acceleration))
+        velocity = max(-vmax, min(vmax, self.velocity[_axis] + acceleration * _dt))
+        position = self.pose[_axis] + velocity * _dt
+        if position < lower or position > upper:
+            position = max(lower, min(upper, position))
+            velocity = 0.0
+        self.velocity[_axis] = velocity
+        return position
+
+    def step(self, _now, _dt):
+        self.actuate(_now)
+        self.pose = [self.step_axis(0, _dt), self.step_axis(1, _dt)]
+        self.history.add(_now, self.pose[0], self.pose[1])
+
+    def run(self):
+        print ">>> Initializing Simulated Head: %s @ %.0f Hz" % (self.name, 1.0 / self.period)
+        self.ready = True
+        next_tick = time.time()
+        last = next_tick
+        while self.run_toggle is True:
+            next_tick += self.period
+            rest = next_tick - time.time()
+            if rest > 0:
+                if self.wait(rest):
+                    break
+            else:
+                next_tick = time.time()
+            now = time.time()
+            self.step(now, now - last)
+            last = now
+        print ">>> Deactivating Simulated Head: %s" % self.name
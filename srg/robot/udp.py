@@ -0,0 +1,172 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import sys
+import time
+import struct
+import socket
+
+# SELF IMPORTS
+from srg.utils import metrics as m
+from srg.utils import lifecycle as lc
+
+
+# Little endian datagram: magic, sequence number (0 if disabled), gaze type,
+# stimulus time and send time in seconds, pan and tilt in degrees. 36 bytes.
+MAGIC  = "SRG2"
+PACKET = struct.Struct("<4sIB3xddff")
+
+
+def stimulus_time(_gaze):
+    """
+    :return time of the stimulus the gaze target was computed from in seconds, 0.0 if unknown
+    """
+    stamp = _gaze.gaze_timestamp
+    if stamp is None:
+        return 0.0
+    return stamp.sec + stamp.nsec / 1e9
+
+
+def parse_outscope(_outscope):
+    """
+    :param _outscope udp://host:port, optionally followed by ?seq=0 to disable sequence numbers
+    :return (host, port, sequence)
+    """
+    rest = _outscope[len("udp://"):]
+    sequence = True
+    if "?" in rest:
+        rest, query = rest.split("?", 1)
+        for item in query.split("&"):
+            if item.lower() in ("seq=0", "seq=off", "seq=false"):
+                sequence = False
+    host, port = rest.rsplit(":", 1)
+    return host, int(port), sequence
+
+
+class UdpRobotController:
+    """
+    Sends every gaze target as one fixed layout datagram to a low level head
+    controller, selected with a udp://host:port outscope. The socket and the
+    packet buffer are created once, sending packs in place and never blocks
+    on the receiver. The datagram carries the stimulus time, so the head
+    controller can judge how old a target is, and the send time.
+    """
+    def __init__(self, _host, _port, _sequence=True):
+        self.address  = (_host, int(_port))
+        self.sequence = _sequence
+        self.seq      = 0
+        self.buffer   = bytearray(PACKET.size)
+        self.socket   = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.errors   = m.REGISTRY.counter("srg_udp_send_errors_total", "Gaze datagrams that could not be sent",
+                                           {"address": "%s:%d" % self.address})
+        print ">>> Sending gaze targets to udp://%s:%d" % self.address
+
+    def set_gaze_target(self, _gaze, _blocking=True):
+        if self.sequence:
+            # 1 .. 2^32 - 1, 0 means no sequence numbers
+            self.seq = self.seq % 0xffffffff + 1
+        PACKET.pack_into(self.buffer, 0, MAGIC, self.seq, _gaze.gaze_type, stimulus_time(_gaze), time.time(),
+                         _gaze.pan, _gaze.tilt)
+        try:
+            self.socket.sendto(self.buffer, self.address)
+        except socket.error:
+            self.errors.inc()
+
+    def close(self):
+        self.socket.close()
+
+
+class UdpReceiver(lc.StoppableThread):
+    """
+    Stand-in for the head controller. Receives gaze datagrams, keeps the
+    last one and counts lost and reordered packets by sequence number.
+    One way latency is measured against the local clock, i.e., it is only
+    meaningful on the same host or with synchronized clocks.
+    """
+    def __init__(self, _port, _host="127.0.0.1"):
+        lc.StoppableThread.__init__(self)
+        self.socket    = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind((_host, int(_port)))
+        self.address   = self.socket.getsockname()
+        self.name      = "udp receiver %s:%d" % self.address
+        self.buffer    = bytearray(PACKET.size)
+        self.ready     = False
+        self.count     = 0
+        self.lost      = 0
+        self.reordered = 0
+        self.last      = None
+        self.last_seq  = None
+        self.latency   = m.REGISTRY.histogram("srg_udp_latency_seconds", "Send to receive time of gaze datagrams",
+                                              {"address": "%s:%d" % self.address})
+
+    def run(self):
+        self.ready = True
+        while self.run_toggle is True:
+            size = self.socket.recv_into(self.buffer)
+            now = time.time()
+            if size != PACKET.size:
+                continue
+            magic, seq, gaze_type, stamp, sent, pan, tilt = PACKET.unpack_from(self.buffer)
+            if magic != MAGIC:
+                continue
+            self.count += 1
+            if seq != 0 and self.last_seq is not None:
+                if seq > self.last_seq + 1:
+                    self.lost += seq - self.last_seq - 1
+                elif seq <= self.last_seq:
+                    self.reordered += 1
+            if seq != 0:
+                self.last_seq = seq
+            self.latency.observe(now - sent)
+            self.last = (seq, gaze_type, stamp, sent, pan, tilt, now)
+        self.socket.close()
+
+    def request_stop(self):
+        self.run_toggle = False
+        # Wake up the blocking receive
+        wakeup = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        wakeup.sendto("", self.address)
+        wakeup.close()
+
+
+if __name__ == '__main__':
+    # Print what a head controller would receive: python -m srg.robot.udp PORT
+    receiver = UdpReceiver(int(sys.argv[1]) if len(sys.argv) > 1 else 9000, "0.0.0.0")
+    receiver.start()
+    try:
+        while True:
+            time.sleep(1.0)
+            print ">>> %d datagrams, %d lost, %d reordered, last %s" % (receiver.count, receiver.lost,
+                                                                       receiver.reordered, str(receiver.last))
+    except KeyboardInterrupt:
+        receiver.request_stop()
@@ -0,0 +1,139 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import time
+import ctypes
+import ctypes.util
+from collections import deque
+
+# SELF IMPORTS
+from srg.utils import metrics as m
+
+
+CLOCK_MONOTONIC = 1
+
+
+class Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+def clock_gettime_monotonic():
+    """
+    Python 2 has no time.monotonic, fall back on clock_gettime from librt/libc
+    :return the clock function or None if not available
+    """
+    for name in (ctypes.util.find_library("rt"), ctypes.util.find_library("c")):
+        if name is None:
+            continue
+        try:
+            gettime = ctypes.CDLL(name, use_errno=True).clock_gettime
+        except (OSError, AttributeError):
+            continue
+        gettime.argtypes = [ctypes.c_int, ctypes.POINTER(Timespec)]
+        spec = Timespec()
+        ref = ctypes.byref(spec)
+
+        def monotonic():
+            gettime(CLOCK_MONOTONIC, ref)
+            return spec.tv_sec + spec.tv_nsec * 1e-9
+        return monotonic
+    return None
+
+
+# Seconds on a clock that never jumps, only differences are meaningful.
+# Without one the wall clock is used and jumps are not filtered.
+monotonic = getattr(time, "monotonic", None) or clock_gettime_monotonic() or time.time
+
+
+def to_monotonic(_wall):
+    """
+    Converts a recent wall clock time, e.g., a message's arrival, to the monotonic clock
+    """
+    return monotonic() - (time.time() - _wall)
+
+
+class ClockOffsetEstimator:
+    """
+    Online estimate of the offset between a source's clock (header stamps)
+    and the local wall clock. Every message yields arrival - stamp, the sum
+    of the offset and its transport delay. The minimum over the last
+    "window" messages is taken as the offset, the excess of a message over
+    it as its transport delay. With one way stamps the constant part of the
+    delay cannot be told apart from the offset and is folded into it.
+    A jump of the local wall clock restarts the estimate.
+    """
+    def __init__(self, _inscope, _window=128, _gain=0.1, _jump=0.5):
+        self.inscope = _inscope
+        self.window  = int(_window)
+        self.gain    = float(_gain)
+        self.jump    = float(_jump)
+        # (message number, sample), increasing samples, the first one is the minimum of the window
+        self.minima  = deque()
+        self.count   = 0
+        self.base    = None
+        self.offset  = None
+        self.delay   = 0.0
+        self.offset_gauge = m.REGISTRY.gauge("srg_clock_offset_seconds",
+                                             "Estimated offset of the local clock to the source's stamps",
+                                             {"source": _inscope})
+        self.delay_gauge  = m.REGISTRY.gauge("srg_transport_delay_seconds",
+                                             "Smoothed transport delay above the minimum",
+                                             {"source": _inscope})
+
+    def update(self, _stamp, _arrival, _mono):
+        """
+        :param _stamp header stamp in seconds on the source's clock
+        :param _arrival local wall clock time of arrival
+        :param _mono the same arrival on the monotonic clock
+        :return the transport delay of this message
+        """
+        base = _arrival - _mono
+        if self.base is not None and abs(base - self.base) > self.jump:
+            print ">>> Wall clock jumped by %.3f s, restarting clock offset estimate of %s" % \
+                  (base - self.base, self.inscope)
+            self.minima.clear()
+        self.base = base
+        sample = _arrival - _stamp
+        minima = self.minima
+        while minima and minima[-1][1] >= sample:
+            minima.pop()
+        minima.append((self.count, sample))
+        if minima[0][0] <= self.count - self.window:
+            minima.popleft()
+        self.count += 1
+        self.offset = minima[0][1]
+        delay = sample - self.offset
+        self.delay += self.gain * (delay - self.delay)
+        self.offset_gauge.set(self.offset)
+        self.delay_gauge.set(self.delay)
+        return delay
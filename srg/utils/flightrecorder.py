@@ -0,0 +1,135 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import sys
+import json
+import time
+import struct
+import threading
+
+
+MAGIC       = "SRGFR1\n"
+MAX_SOURCES = 8
+NAN         = float("nan")
+# time, winner, override, override source, paused, stimulus ages, winner target pan/tilt, sent pan/tilt
+RECORD      = struct.Struct("<dbbbb%dfffff" % MAX_SOURCES)
+
+
+class FlightRecorder:
+    """
+    Always-on record of the arbitration decisions in a fixed size binary
+    ring buffer. Writing a record is a single struct.pack_into into a
+    preallocated bytearray, nothing is allocated on the heap. The buffer
+    is only copied when dumping.
+    """
+    def __init__(self, _robot, _sources, _records=65536):
+        self.robot   = _robot
+        self.sources = list(_sources)[:MAX_SOURCES]
+        self.records = int(_records)
+        self.buffer  = bytearray(RECORD.size * self.records)
+        self.index   = 0
+        self.count   = 0
+        self.lock    = threading.Lock()
+
+    def record(self, _now, _winner, _override, _override_source, _paused, _ages, _target, _sent):
+        """
+        :param _ages list of MAX_SOURCES stimulus ages in seconds, NaN without stimulus
+        :param _target (pan, tilt) of the winning source
+        :param _sent (pan, tilt) of the last command sent to the robot
+        """
+        i = self.index
+        RECORD.pack_into(self.buffer, i * RECORD.size, _now, _winner, _override, _override_source, _paused,
+                         _ages[0], _ages[1], _ages[2], _ages[3], _ages[4], _ages[5], _ages[6], _ages[7],
+                         _target[0], _target[1], _sent[0], _sent[1])
+        i += 1
+        if i == self.records:
+            i = 0
+        self.index = i
+        if self.count < self.records:
+            self.count += 1
+
+    def dump(self, _path):
+        """
+        Writes a header line (json) and the records, oldest first
+        """
+        self.lock.acquire()
+        try:
+            data = bytes(self.buffer)
+            index, count = self.index, self.count
+            start = (index - count) % self.records
+            if start + count <= self.records:
+                records = data[start * RECORD.size:(start + count) * RECORD.size]
+            else:
+                records = data[start * RECORD.size:] + data[:index * RECORD.size]
+            header = {"robot": self.robot, "sources": self.sources, "record_size": RECORD.size,
+                      "count": count, "dumped": time.time()}
+            f = open(_path, "wb")
+            f.write(MAGIC)
+            f.write(json.dumps(header) + "\n")
+            f.write(records)
+            f.close()
+        finally:
+            self.lock.release()
+        print ">>> Flight recorder of %s dumped %d records to %s" % (self.robot, count, _path)
+        return _path
+
+
+def decode(_path, _out=sys.stdout):
+    """
+    Converts a flight recorder dump to CSV
+    """
+    f = open(_path, "rb")
+    if f.readline() != MAGIC:
+        f.close()
+        raise ValueError("%s is not a flight recorder dump" % _path)
+    header = json.loads(f.readline())
+    if header["record_size"] != RECORD.size:
+        f.close()
+        raise ValueError("Record size %d does not match this decoder (%d)" % (header["record_size"], RECORD.size))
+    sources = header["sources"]
+    columns = ["time", "winner", "override", "override_source", "paused"]
+    columns += ["age %s" % s for s in sources]
+    columns += ["target_pan", "target_tilt", "sent_pan", "sent_tilt"]
+    _out.write(",".join(columns) + "\n")
+    while True:
+        data = f.read(RECORD.size)
+        if len(data) < RECORD.size:
+            break
+        values = RECORD.unpack(data)
+        winner = sources[values[1]] if 0 <= values[1] < len(sources) else ""
+        override_source = sources[values[3]] if 0 <= values[3] < len(sources) else ""
+        ages = ["" if a != a else "%.4f" % a for a in values[5:5 + len(sources)]]
+        row = ["%.6f" % values[0], winner, str(values[2]), override_source, str(values[4])] + ages
+        row += ["%.3f" % v for v in values[5 + MAX_SOURCES:]]
+        _out.write(",".join(row) + "\n")
+    f.close()
@@ -0,0 +1,148 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import sys
+import time
+import threading
+
+
+class StoppableThread(threading.Thread):
+    """
+    Thread with an event based stop signal. run_toggle keeps working as
+    before, setting it to False sets the event and wakes up a thread that
+    waits in wait() at once instead of after its next sleep. Threads are
+    daemons, a component that does not stop in time cannot keep the
+    process alive.
+    """
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.stop_event = threading.Event()
+
+    @property
+    def run_toggle(self):
+        return not self.stop_event.is_set()
+
+    @run_toggle.setter
+    def run_toggle(self, _value):
+        if _value:
+            self.stop_event.clear()
+        else:
+            self.stop_event.set()
+
+    def request_stop(self):
+        self.run_toggle = False
+
+    def wait(self, _timeout=None):
+        """
+        Sleeps up to _timeout seconds (forever if None), returns early on stop
+        :return True if a stop was requested
+        """
+        return self.stop_event.wait(_timeout)
+
+
+def join_all(_threads, _timeout):
+    """
+    Joins _threads, all of them together within _timeout seconds
+    :return list of threads still alive afterwards
+    """
+    deadline = time.time() + _timeout
+    for thread in _threads:
+        if thread.ident is None:
+            continue
+        rest = deadline - time.time()
+        if rest > 0:
+            thread.join(rest)
+    return [thread for thread in _threads if thread.ident is not None and thread.is_alive()]
+
+
+def parallel(_calls):
+    """
+    Runs _calls (callables without arguments) concurrently and waits for all
+    of them. The first exception raised by a call is re-raised afterwards.
+    """
+    errors = []
+
+    def call(_fn):
+        try:
+            _fn()
+        except BaseException:
+            errors.append(sys.exc_info())
+
+    threads = [threading.Thread(target=call, args=(fn,), name="boot %s" % getattr(fn, "__name__", "call"))
+               for fn in _calls]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0][0], errors[0][1], errors[0][2]
+
+
+class ReadinessBarrier:
+    """
+    Waits for components with a "ready" attribute, each with its own timeout
+    counted from the start of wait(). Optional components that are not ready
+    in time are left behind, required ones are reported.
+    """
+    def __init__(self):
+        self.components = []
+        self.times      = {}
+
+    def add(self, _name, _component, _timeout, _optional=False):
+        self.components.append((_name, _component, float(_timeout), bool(_optional)))
+
+    def wait(self):
+        """
+        :return list of names of required components that are not ready
+        """
+        start = time.time()
+        waiting = list(self.components)
+        while waiting:
+            now = time.time()
+            rest = []
+            for name, component, timeout, optional in waiting:
+                if component.ready:
+                    self.times[name] = now - start
+                elif now - start < timeout:
+                    rest.append((name, component, timeout, optional))
+                elif optional:
+                    print ">>> Optional %s not ready after %.1f s, continuing without it" % (name, timeout)
+                else:
+                    print ">>> %s not ready after %.1f s" % (name, timeout)
+            waiting = rest
+            if waiting:
+                time.sleep(0.005)
+        return [name for name, component, timeout, optional in self.components
+                if not optional and name not in self.times]
@@ -0,0 +1,265 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import bisect
+import threading
+import BaseHTTPServer
+
+# SELF IMPORTS
+from srg.utils import lifecycle as lc
+
+
+# Latency buckets in seconds, 100 us up to 10 s
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_labels(_labels):
+    if not _labels:
+        return ""
+    return "{" + ",".join('%s="%s"' % (k, _labels[k]) for k in sorted(_labels)) + "}"
+
+
+class Counter:
+    """
+    Monotonic counter, increments are cheap enough for the hot path.
+    """
+    kind = "counter"
+
+    def __init__(self, _labels):
+        self.labels = format_labels(_labels)
+        self.lock   = threading.Lock()
+        self.value  = 0
+
+    def inc(self, _amount=1):
+        self.lock.acquire()
+        self.value += _amount
+        self.lock.release()
+
+    def render(self, _name):
+        return ["%s%s %s" % (_name, self.labels, self.value)]
+
+
+class Gauge:
+    """
+    Last written value wins, no locking needed.
+    """
+    kind = "gauge"
+
+    def __init__(self, _labels):
+        self.labels = format_labels(_labels)
+        self.value  = 0.0
+
+    def set(self, _value):
+        self.value = _value
+
+    def render(self, _name):
+        return ["%s%s %s" % (_name, self.labels, repr(float(self.value)))]
+
+
+class Histogram:
+    """
+    Fixed bucket histogram. Observing is a bisect over the bucket bounds
+    plus one increment, nothing is allocated.
+    """
+    kind = "histogram"
+
+    def __init__(self, _labels, _buckets=LATENCY_BUCKETS):
+        self.label_dict = dict(_labels or {})
+        self.labels     = format_labels(_labels)
+        self.buckets    = tuple(_buckets)
+        self.counts     = [0] * (len(self.buckets) + 1)
+        self.sum        = 0.0
+        self.count      = 0
+        self.lock       = threading.Lock()
+
+    def observe(self, _value):
+        i = bisect.bisect_left(self.buckets, _value)
+        self.lock.acquire()
+        self.counts[i] += 1
+        self.sum += _value
+        self.count += 1
+        self.lock.release()
+
+    def quantile(self, _q):
+        """
+        Upper bucket bound that contains the given quantile, None without samples.
+        """
+        self.lock.acquire()
+        counts = list(self.counts)
+        total = self.count
+        self.lock.release()
+        if total == 0:
+            return None
+        rank = _q * total
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def render(self, _name):
+        self.lock.acquire()
+        counts = list(self.counts)
+        total = self.count
+        sum_ = self.sum
+        self.lock.release()
+        lines = []
+        cumulative = 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            cumulative += c
+            labels = dict(self.label_dict)
+            labels["le"] = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append("%s_bucket%s %d" % (_name, format_labels(labels), cumulative))
+        lines.append("%s_sum%s %s" % (_name, self.labels, repr(sum_)))
+        lines.append("%s_count%s %d" % (_name, self.labels, total))
+        return lines
+
+
+class Registry:
+    """
+    Holds all metrics of the process. Metrics are looked up once at
+    construction time of a component and then used directly.
+    """
+    def __init__(self):
+        self.lock     = threading.Lock()
+        self.families = {}
+
+    def get(self, _cls, _name, _help, _labels=None, **kwargs):
+        key = format_labels(_labels)
+        self.lock.acquire()
+        try:
+            if _name not in self.families:
+                self.families[_name] = (_cls, _help, {})
+            cls, help_, children = self.families[_name]
+            if cls is not _cls:
+                raise ValueError("Metric %s is already registered as %s" % (_name, cls.kind))
+            if key not in children:
+                children[key] = _cls(_labels, **kwargs)
+            return children[key]
+        finally:
+            self.lock.release()
+
+    def counter(self, _name, _help, _labels=None):
+        return self.get(Counter, _name, _help, _labels)
+
+    def gauge(self, _name, _help, _labels=None):
+        return self.get(Gauge, _name, _help, _labels)
+
+    def histogram(self, _name, _help, _labels=None, _buckets=LATENCY_BUCKETS):
+        return self.get(Histogram, _name, _help, _labels, _buckets=_buckets)
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        self.lock.acquire()
+        families = sorted((name, cls, help_, list(children.values()))
+                          for name, (cls, help_, children) in self.families.items())
+        self.lock.release()
+        lines = []
+        for name, cls, help_, children in families:
+            lines.append("# HELP %s %s" % (name, help_))
+            lines.append("# TYPE %s %s" % (name, cls.kind))
+            for child in children:
+                lines.extend(child.render(name))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsHttpExporter(lc.StoppableThread):
+    """
+    Serves the registry as plain text on http://host:port/metrics. Requests
+    are handled one at a time, the stop flag is checked every 100 ms.
+    """
+    def __init__(self, _port, _host="127.0.0.1", _registry=REGISTRY):
+        lc.StoppableThread.__init__(self)
+        self.name   = "metrics http %s:%d" % (_host, int(_port))
+        self.server = BaseHTTPServer.HTTPServer((_host, int(_port)), MetricsHandler)
+        self.server.registry = _registry
+        self.server.timeout  = 0.1
+
+    def run(self):
+        print ">>> Serving metrics on http://%s:%d/metrics" % self.server.server_address
+        while self.run_toggle is True:
+            self.server.handle_request()
+        self.server.server_close()
+
+
+class MetricsFileDumper(lc.StoppableThread):
+    """
+    Periodically writes the registry to a file. The file is replaced
+    atomically, readers never see a half written dump.
+    """
+    def __init__(self, _path, _interval=5.0, _registry=REGISTRY):
+        lc.StoppableThread.__init__(self)
+        self.name       = "metrics dump %s" % _path
+        self.path       = _path
+        self.interval   = float(_interval)
+        self.registry   = _registry
+
+    def dump(self):
+        tmp = self.path + ".tmp"
+        f = open(tmp, "w")
+        f.write(self.registry.render())
+        f.close()
+        os.rename(tmp, self.path)
+
+    def run(self):
+        print ">>> Dumping metrics to %s every %.1f s" % (self.path, self.interval)
+        while not self.wait(self.interval):
+            try:
+                self.dump()
+            except Exception, e:
+                print ">>> Could not dump metrics %s" % str(e)
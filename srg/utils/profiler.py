@@ -0,0 +1,149 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import sys
+import time
+import threading
+
+# SELF IMPORTS
+from srg.utils import lifecycle as lc
+
+
+# Samples per second, low enough to not disturb the gaze loops
+DEFAULT_RATE = 100.0
+
+
+class SamplingThread(lc.StoppableThread):
+    """
+    Samples the stacks of all other threads at a fixed rate
+    """
+    def __init__(self, _profiler):
+        lc.StoppableThread.__init__(self)
+        self.name     = "profiler"
+        self.profiler = _profiler
+
+    def run(self):
+        period = 1.0 / self.profiler.rate
+        while not self.wait(period):
+            self.profiler.sample(self.ident)
+
+
+class Profiler:
+    """
+    Statistical profiler for the running process. While enabled, a thread
+    samples the stack of every thread from sys._current_frames and counts
+    identical stacks. Stopping writes them in the collapsed format of
+    flamegraph.pl/speedscope, one "thread;frame;...;frame count" line per
+    stack, the root frame is the thread's name (arbitration, connector,
+    controller, ...), the main thread is labelled "main_label".
+    """
+    def __init__(self, _rate=DEFAULT_RATE):
+        self.rate       = float(_rate)
+        self.directory  = "/tmp"
+        self.main_label = "main"
+        self.lock       = threading.Lock()
+        self.thread     = None
+        self.stacks     = {}
+        self.frames     = {}
+        self.samples    = 0
+        self.started    = None
+
+    @property
+    def enabled(self):
+        return self.thread is not None
+
+    def set_enabled(self, _enabled):
+        """
+        Starts or stops sampling, stopping writes the profile
+        :return path of the written profile or None
+        """
+        self.lock.acquire()
+        try:
+            if _enabled and self.thread is None:
+                self.stacks = {}
+                self.samples = 0
+                self.started = time.time()
+                self.thread = SamplingThread(self)
+                self.thread.start()
+                print ">>> Profiling at %.0f Hz" % self.rate
+            elif not _enabled and self.thread is not None:
+                self.thread.request_stop()
+                self.thread.join()
+                self.thread = None
+                return self.write()
+        finally:
+            self.lock.release()
+
+    def toggle(self):
+        return self.set_enabled(not self.enabled)
+
+    def label(self, _code):
+        # Cached per code object, sampling only does dict lookups
+        label = self.frames.get(_code)
+        if label is None:
+            label = "%s:%s" % (os.path.basename(_code.co_filename), _code.co_name)
+            self.frames[_code] = label
+        return label
+
+    def sample(self, _own):
+        names = dict((t.ident, t.name) for t in threading.enumerate())
+        for ident, frame in sys._current_frames().items():
+            if ident == _own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self.label(frame.f_code))
+                frame = frame.f_back
+            name = names.get(ident, "thread %d" % ident)
+            if name == "MainThread":
+                name = self.main_label
+            stack.append(name.replace(";", ":"))
+            stack.reverse()
+            key = ";".join(stack)
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def write(self):
+        path = os.path.join(self.directory, "srg_profile_%d.folded" % int(self.started))
+        f = open(path, "w")
+        try:
+            for stack, count in sorted(self.stacks.items()):
+                f.write("%s %d\n" % (stack, count))
+        finally:
+            f.close()
+        print ">>> Wrote profile with %d samples in %.1f s to %s" % (self.samples, time.time() - self.started, path)
+        return path
+
+
+PROFILER = Profiler()
@@ -0,0 +1,75 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+class InterArrivalEstimator:
+    """
+    Online estimate of a stream's inter-arrival time and jitter, smoothed
+    like the TCP retransmission timer: mean and mean deviation as
+    exponentially weighted moving averages.
+    """
+    def __init__(self, _gain=0.125, _deviation_gain=0.25):
+        self.gain           = _gain
+        self.deviation_gain = _deviation_gain
+        self.mean           = None
+        self.deviation      = 0.0
+        self.last           = None
+        self.samples        = 0
+
+    def update(self, _arrival):
+        if self.last is not None:
+            interval = _arrival - self.last
+            if interval >= 0.0:
+                if self.mean is None:
+                    self.mean = interval
+                    self.deviation = interval / 2.0
+                else:
+                    self.deviation += self.deviation_gain * (abs(interval - self.mean) - self.deviation)
+                    self.mean += self.gain * (interval - self.mean)
+                self.samples += 1
+        self.last = _arrival
+
+    def rate(self):
+        """
+        :return messages per second or None without estimate
+        """
+        if self.mean is None or self.mean <= 0.0:
+            return None
+        return 1.0 / self.mean
+
+    def deadline(self, _k, _minimum, _maximum):
+        """
+        Time after the last arrival that the next message should have arrived by
+        :param _k number of deviations added to the mean
+        """
+        if self.mean is None:
+            return _maximum
+        return max(_minimum, min(_maximum, self.mean + _k * self.deviation))
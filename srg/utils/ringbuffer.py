@@ -0,0 +1,152 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import array
+
+
+# Default amount of samples kept per series, ~25 seconds at 20 Hz
+DEFAULT_SIZE = 512
+
+
+class RingBuffer:
+    """
+    Fixed size time series backed by preallocated arrays. Every sample
+    consists of a timestamp and one or two values. Pushing overwrites
+    the oldest sample, costs O(1) and never grows the arrays.
+    """
+    def __init__(self, _size=DEFAULT_SIZE, _width=1):
+        self.size   = int(_size)
+        self.width  = int(_width)
+        self.stamps = array.array('d', [0.0]) * self.size
+        self.values = array.array('d', [0.0]) * (self.size * self.width)
+        self.index  = 0
+        self.count  = 0
+
+    def push(self, _stamp, _value):
+        i = self.index
+        self.stamps[i] = _stamp
+        self.values[i * self.width] = _value
+        self.advance()
+
+    def push2(self, _stamp, _first, _second):
+        i = self.index
+        self.stamps[i] = _stamp
+        self.values[i * 2] = _first
+        self.values[i * 2 + 1] = _second
+        self.advance()
+
+    def advance(self):
+        self.index += 1
+        if self.index == self.size:
+            self.index = 0
+        if self.count < self.size:
+            self.count += 1
+
+    def last(self):
+        if self.count == 0:
+            return None
+        i = (self.index - 1) % self.size
+        return [self.stamps[i]] + list(self.values[i * self.width:(i + 1) * self.width])
+
+    def path_length(self, _since):
+        """
+        Sum of the absolute changes over all columns, newest samples back to _since.
+        Walks the arrays in place, nothing is copied.
+        """
+        total = 0.0
+        w = self.width
+        i = (self.index - 1) % self.size
+        prev = None
+        for n in xrange(self.count):
+            if self.stamps[i] < _since:
+                break
+            if prev is not None:
+                for c in xrange(w):
+                    total += abs(self.values[prev * w + c] - self.values[i * w + c])
+            prev = i
+            i = (i - 1) % self.size
+        return total
+
+    def snapshot(self):
+        """
+        Copy the buffer content, oldest sample first. This is not synchronized
+        with writers, a concurrent push may replace the oldest sample while
+        copying. Readers are GUI and metrics, they can live with that.
+        :return dict with "stamps" and "values" lists, values hold one list per sample if width > 1
+        """
+        count = self.count
+        start = (self.index - count) % self.size
+        order = [(start + n) % self.size for n in xrange(count)]
+        stamps = [self.stamps[i] for i in order]
+        if self.width == 1:
+            values = [self.values[i] for i in order]
+        else:
+            w = self.width
+            values = [list(self.values[i * w:(i + 1) * w]) for i in order]
+        return {"stamps": stamps, "values": values}
+
+
+class SourceHistory:
+    """
+    Holds the ring buffers of one input source. Filled by the middleware
+    callbacks (rate, targets), the arbitration (decision latency) and
+    the gaze controller (commands, stimulus to command latency).
+    """
+    def __init__(self, _size=DEFAULT_SIZE):
+        self.stimulus_rate    = RingBuffer(_size)
+        self.targets          = RingBuffer(_size, 2)
+        self.decision_latency = RingBuffer(_size)
+        self.commands         = RingBuffer(_size, 2)
+        self.command_latency  = RingBuffer(_size)
+        self.last_arrival     = None
+
+    def add_stimulus(self, _arrival, _pan, _tilt):
+        if self.last_arrival is not None and _arrival > self.last_arrival:
+            self.stimulus_rate.push(_arrival, 1.0 / (_arrival - self.last_arrival))
+        self.last_arrival = _arrival
+        self.targets.push2(_arrival, _pan, _tilt)
+
+    def add_decision(self, _now, _latency):
+        self.decision_latency.push(_now, _latency)
+
+    def add_command(self, _now, _pan, _tilt, _latency=None):
+        self.commands.push2(_now, _pan, _tilt)
+        if _latency is not None:
+            self.command_latency.push(_now, _latency)
+
+    def snapshot(self):
+        return {"stimulus_rate":    self.stimulus_rate.snapshot(),
+                "targets":          self.targets.snapshot(),
+                "decision_latency": self.decision_latency.snapshot(),
+                "commands":         self.commands.snapshot(),
+                "command_latency":  self.command_latency.snapshot()}
@@ -0,0 +1,102 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import json
+import thread
+import itertools
+import threading
+
+
+# Amount of spans kept, older ones are overwritten
+DEFAULT_SIZE = 65536
+
+
+class Tracer:
+    """
+    Collects spans of the gaze pipeline stages. Slots are claimed through
+    an itertools counter, which is atomic in CPython, so writers never
+    take a lock. Callers check "enabled" before taking timestamps, a
+    disabled tracer costs one attribute lookup per stage.
+    """
+    def __init__(self, _size=DEFAULT_SIZE):
+        self.enabled = False
+        self.size    = int(_size)
+        self.spans   = [None] * self.size
+        self.counter = itertools.count()
+        self.names   = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, _name, _start, _end, _stamp=None):
+        """
+        :param _name pipeline stage
+        :param _start wall clock start in seconds
+        :param _end wall clock end in seconds
+        :param _stamp stimulus header stamp, used as correlation id
+        """
+        tid = thread.get_ident()
+        if tid not in self.names:
+            self.names[tid] = threading.current_thread().name
+        self.spans[next(self.counter) % self.size] = (_name, _start, _end, _stamp, tid)
+
+    def to_chrome_trace(self):
+        """
+        :return dict in the Chrome trace event format, load it in chrome://tracing or Perfetto
+        """
+        pid = os.getpid()
+        events = []
+        # Copies, writers add threads and spans while the trace is exported
+        for tid, name in list(self.names.items()):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+        for span in sorted((s for s in list(self.spans) if s is not None), key=lambda s: s[1]):
+            name, start, end, stamp, tid = span
+            event = {"name": name, "cat": "srg", "ph": "X", "pid": pid, "tid": tid,
+                     "ts": start * 1e6, "dur": max(end - start, 0.0) * 1e6}
+            if stamp is not None:
+                event["args"] = {"stamp": "%.6f" % stamp}
+            events.append(event)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, _path):
+        f = open(_path, "w")
+        json.dump(self.to_chrome_trace(), f)
+        f.close()
+        print ">>> Wrote trace to %s" % _path
+
+
+TRACER = Tracer()
@@ -0,0 +1,89 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import time
+import unittest
+
+# SELF IMPORTS
+from srg.behavior import arbitration as a
+from srg.benchmark import robots as rb
+from srg.middleware import local as l
+from srg.middleware import stimulus as st
+
+
+class SharedHubReloadTest(unittest.TestCase):
+
+    def test_reload_keeps_a_source_other_robots_use(self):
+        hub = st.SourceHub()
+        configs = [rb.write_config(2), rb.write_config(2)]
+        robots = []
+        try:
+            for n, config in enumerate(configs):
+                ar = a.Arbitration(config, "local://robot%d" % n, hub, l.LocalControlConnector())
+                ar.read_yaml_config()
+                ar.boot_robot_driver()
+                ar.configure_middleware()
+                ar.wait_for_subscribers(5.0)
+                robots.append(ar)
+            for ar in robots:
+                ar.start()
+            shared = hub.sources["/bench/source1"]
+            # robot0 changes the datatype of the shared source
+            f = open(configs[0])
+            text = f.read()
+            f.close()
+            f = open(configs[0], "w")
+            f.write(text.replace("datatypes: [local:People, local:People]",
+                                 "datatypes: [local:People, local:PointStamped]"))
+            f.close()
+            self.assertTrue(robots[0].reload_config())
+            self.assertTrue(hub.sources["/bench/source1"] is not shared)
+            self.assertTrue(robots[1].input_sources[1].source is shared)
+            self.assertTrue(shared in hub.running())
+            then = time.time()
+            shared.feed_people(then, [(160.0, 120.0, 40.0)])
+            arrival = robots[1].input_sources[1].current_robot_gaze_arrival
+            self.assertTrue(arrival is not None and arrival >= then, "robot1 lost the shared source")
+            self.assertTrue(shared.run_toggle)
+        finally:
+            hub.request_stop()
+            for ar in robots:
+                ar.stop()
+            for config in configs:
+                os.remove(config)
+        self.assertFalse(shared.run_toggle)
+
+
+if __name__ == '__main__':
+    unittest.main()
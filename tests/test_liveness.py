@@ -0,0 +1,78 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import os
+import time
+import unittest
+
+# SELF IMPORTS
+from srg.behavior import arbitration as a
+from srg.benchmark import failover as fo
+from srg.middleware import local as l
+
+
+class PausedLivenessTest(unittest.TestCase):
+
+    def test_silent_source_while_paused(self):
+        config = fo.write_config(1.0, 4.0)
+        control = l.LocalControlConnector()
+        ar = a.Arbitration(config, "local://liveness", None, control)
+        try:
+            ar.read_yaml_config()
+            ar.boot_robot_driver()
+            ar.configure_middleware()
+            ar.wait_for_subscribers(5.0)
+            primary = ar.hub.sources["/bench/primary"]
+            ar.start()
+            # Learn a 100 Hz inter-arrival time, then pause and fall silent
+            for n in xrange(50):
+                primary.feed_people(time.time(), [(160.0, 120.0, 40.0)])
+                time.sleep(0.01)
+            control.send("pause")
+            time.sleep(2.2)
+            speed = ar.loop_speed
+            live = primary.liveness.live
+            failover = primary.liveness.failover
+            control.send("resume")
+        finally:
+            ar.stop()
+            os.remove(config)
+        self.assertFalse(live, "silent source still live while paused")
+        self.assertTrue(speed <= 60, "arbitration ran at %d ticks/s while paused" % speed)
+        self.assertTrue(failover.count >= 1)
+        self.assertTrue(failover.sum / failover.count < 0.5,
+                        "failover of %.3f s measured after the pause" % (failover.sum / failover.count))
+
+
+if __name__ == '__main__':
+    unittest.main()
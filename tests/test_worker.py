@@ -0,0 +1,75 @@
+"""
+
+This file is part of FINITE STATE MACHINE BASED TESTING.
+
+Copyright(c) <Florian Lier, Simon Schulz>
+http://opensource.cit-ec.de/fsmt
+
+This file may be licensed under the terms of the
+GNU Lesser General Public License Version 3 (the ``LGPL''),
+or (at your option) any later version.
+
+Software distributed under the License is distributed
+on an ``AS IS'' basis, WITHOUT WARRANTY OF ANY KIND, either
+express or implied. See the LGPL for the specific language
+governing rights and limitations.
+
+You should have received a copy of the LGPL along with this
+program. If not, go to http://www.gnu.org/licenses/lgpl.html
+or write to the Free Software Foundation, Inc.,
+51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+
+The development of this software was supported by the
+Excellence Cluster EXC 277 Cognitive Interaction Technology.
+The Excellence Cluster EXC 277 is a grant of the Deutsche
+Forschungsgemeinschaft (DFG) in the context of the German
+Excellence Initiative.
+
+Authors: Florian Lier, Simon Schulz
+<flier, sschulz>@techfak.uni-bielefeld.de
+
+"""
+
+# STD IMPORTS
+import time
+import unittest
+
+# SELF IMPORTS
+from srg.middleware import stimulus as st
+
+
+class RecordingView:
+    """
+    Minimal view, keeps everything a source hands over
+    """
+    def __init__(self, _source):
+        self.source  = _source
+        self.stimuli = []
+        _source.add_view(self)
+
+    def update(self, _stamp, _x, _y, _z, _arrival, _mono, _delay):
+        self.stimuli.append((_stamp, _x, _y, _z, _arrival, _mono, _delay))
+
+
+class WorkerSourceTest(unittest.TestCase):
+
+    def test_stimuli_reach_the_parent(self):
+        hub = st.SourceHub()
+        source = hub.source("/test/worker", "synthetic", "People", {"rate": 100.0}, True)
+        view = RecordingView(source)
+        hub.start()
+        try:
+            deadline = time.time() + 10.0
+            while len(view.stimuli) < 5 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            hub.request_stop()
+            source.join(5.0)
+        self.assertTrue(len(view.stimuli) >= 5, "only %d stimuli from the worker" % len(view.stimuli))
+        stamp, x, y, z, arrival, mono, delay = view.stimuli[-1]
+        self.assertTrue(arrival >= stamp)
+        self.assertTrue(delay >= 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()